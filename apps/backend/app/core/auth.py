@@ -1,148 +1,153 @@
 """
 Supabase JWT token doğrulama ve kullanıcı bilgisi çıkarma.
 """
+import hashlib
 import logging
+import time
 from typing import Annotated
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
-from sqlalchemy import select
+from jose import jwt
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import MISSING, TTLCache
 from app.core.config import settings
 from app.db.session import get_session
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user_id(
+_claims_cache = TTLCache(settings.jwt_claims_cache_size, settings.jwt_claims_cache_max_ttl)
+_known_user_ids = TTLCache(settings.known_users_cache_size, settings.known_users_cache_ttl)
+_dev_mode_warned = False
+
+
+def _decode_token(token: str) -> dict:
+    """Token'ı doğrular ve claim'leri döner. Secret yoksa (development) imza doğrulanmaz."""
+    global _dev_mode_warned
+    if not settings.supabase_jwt_secret:
+        if not _dev_mode_warned:
+            logger.warning("SUPABASE_JWT_SECRET not set, skipping token validation (development mode)")
+            _dev_mode_warned = True
+        return jwt.get_unverified_claims(token)
+
+    # Audience kontrolünü kapatıyoruz çünkü Supabase token'ları farklı audience değerleri kullanabilir
+    return jwt.decode(
+        token,
+        settings.supabase_jwt_secret,
+        algorithms=[settings.jwt_algorithm],
+        options={"verify_aud": False},
+    )
+
+
+async def get_token_claims(
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
-) -> UUID:
+) -> dict:
     """
-    JWT token'dan user_id çıkarır.
-    Supabase JWT token formatını kullanır.
+    Bearer token'ın doğrulanmış claim'leri.
+    FastAPI bağımlılık cache'i sayesinde istek başına bir kez çalışır; doğrulanmış
+    claim'ler token hash'i ile `exp` zamanına kadar süreç içinde saklanır.
     """
     token = credentials.credentials
-    logger.info(f"Received token (first 20 chars): {token[:20] if token else 'None'}...")
-    logger.info(f"SUPABASE_JWT_SECRET is set: {bool(settings.supabase_jwt_secret)}")
+    key = hashlib.sha256(token.encode("utf-8")).digest()
 
-    if not settings.supabase_jwt_secret:
-        logger.warning("SUPABASE_JWT_SECRET not set, skipping token validation (development mode)")
-        # Development için geçici olarak token'dan user_id çıkarmayı dene
-        try:
-            # Token'ı decode et (secret olmadan, sadece payload için)
-            decoded = jwt.decode(
-                token,
-                options={"verify_signature": False},
-            )
-            user_id = decoded.get("sub")
-            if user_id:
-                logger.info(f"Development mode: Using user_id from token: {user_id}")
-                return UUID(user_id)
-        except Exception as e:
-            logger.error(f"Error decoding token in development mode: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=f"Invalid token format: {str(e)}",
-            )
+    claims = _claims_cache.get(key)
+    if claims is not MISSING:
+        return claims
+
+    try:
+        claims = _decode_token(token)
+    except Exception as e:
+        logger.debug(f"Token decode failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token missing user_id",
+            detail="Invalid authentication credentials",
         )
 
-    try:
-        # Supabase JWT secret ile token'ı doğrula
-        # Audience kontrolünü kapatıyoruz çünkü Supabase token'ları farklı audience değerleri kullanabilir
-        payload = jwt.decode(
-            token,
-            settings.supabase_jwt_secret,
-            algorithms=[settings.jwt_algorithm],
-            options={"verify_aud": False},
+    exp = claims.get("exp")
+    ttl = settings.jwt_claims_cache_max_ttl
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        _claims_cache.set(key, claims, ttl=ttl)
+    return claims
+
+
+def _user_id_from_claims(claims: dict) -> UUID:
+    user_id = claims.get("sub")
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token missing user_id",
         )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-            )
-        logger.info(f"Successfully decoded token for user_id: {user_id}")
+    try:
         return UUID(user_id)
-    except JWTError as e:
-        logger.error(f"JWT decode error: {e}", exc_info=True)
+    except (ValueError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
 
 
-async def get_or_create_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    session: AsyncSession = Depends(get_session),
-) -> User:
+async def get_current_user_id(
+    claims: Annotated[dict, Depends(get_token_claims)]
+) -> UUID:
     """
-    Kullanıcıyı veritabanında bulur, yoksa JWT token'dan bilgileri alarak oluşturur.
+    JWT token'dan user_id çıkarır.
+    Supabase JWT token formatını kullanır.
     """
-    token = credentials.credentials
-    
-    # Token'dan user_id ve email'i al
-    user_id: UUID | None = None
-    email: str | None = None
-    
+    user_id = _user_id_from_claims(claims)
+    logger.debug(f"Authenticated user_id: {user_id}")
+    return user_id
+
+
+async def get_optional_user_id(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(optional_security)]
+) -> UUID | None:
+    """Geçerli bir token varsa user_id, yoksa None (401 fırlatmaz)."""
+    if credentials is None:
+        return None
     try:
-        if settings.supabase_jwt_secret:
-            payload = jwt.decode(
-                token,
-                settings.supabase_jwt_secret,
-                algorithms=[settings.jwt_algorithm],
-                options={"verify_aud": False},
-            )
-        else:
-            # Development mode
-            payload = jwt.decode(
-                token,
-                options={"verify_signature": False},
-            )
-        
-        user_id_str = payload.get("sub")
-        if user_id_str:
-            user_id = UUID(user_id_str)
-        email = payload.get("email") or payload.get("user_email") or f"user_{user_id}@temp.local"
-    except Exception as e:
-        logger.error(f"Error decoding token in get_or_create_user: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-        )
-    
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token missing user_id",
-        )
-    
-    # Önce kullanıcıyı kontrol et
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+        return _user_id_from_claims(await get_token_claims(credentials))
+    except HTTPException:
+        return None
+
+
+async def get_current_db_user_id(
+    claims: Annotated[dict, Depends(get_token_claims)],
+    session: AsyncSession = Depends(get_session),
+) -> UUID:
+    """
+    Token'daki kullanıcının users tablosunda var olduğunu garanti eder ve id'sini döner;
+    yoksa JWT token'dan bilgileri alarak oluşturur.
     
-    if user:
-        return user
+    Tek bir INSERT ... ON CONFLICT DO NOTHING ile çalışır (eşzamanlı ilk istekler
+    yarışmaz). Varlığı doğrulanmış kullanıcılar süreç içinde hatırlanır; tekrar eden
+    isteklerde users tablosuna gidilmez. Bilerek yalnızca id döner: token'dan kurulan
+    email / full_name kayıttakinden farklı olabilir, satırın alanları gerekiyorsa
+    DB'den okunmalıdır.
+    """
+    user_id = _user_id_from_claims(claims)
+    if _known_user_ids.get(user_id) is not MISSING:
+        return user_id
     
-    # Kullanıcı yoksa oluştur
-    new_user = User(
-        id=user_id,
-        email=email,
-        full_name=payload.get("full_name") or payload.get("name") or None,
+    email = claims.get("email") or claims.get("user_email") or f"user_{user_id}@temp.local"
+    stmt = (
+        pg_insert(User)
+        .values(id=user_id, email=email, full_name=claims.get("full_name") or claims.get("name") or None)
+        .on_conflict_do_nothing(index_elements=[User.id])
+        .returning(User.id)
     )
-    session.add(new_user)
     try:
+        result = await session.execute(stmt)
+        created = result.scalar_one_or_none()
         await session.commit()
-        await session.refresh(new_user)
-        logger.info(f"Created new user in database: {user_id} with email: {email}")
-        return new_user
     except Exception as e:
         await session.rollback()
         logger.error(f"Error creating user: {e}", exc_info=True)
@@ -150,4 +155,8 @@ async def get_or_create_user(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Kullanıcı oluşturulurken bir hata oluştu",
         )
-
+    
+    if created is not None:
+        logger.info(f"Created new user in database: {user_id}")
+    _known_user_ids.set(user_id, True)
+    return user_id
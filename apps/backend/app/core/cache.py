@@ -0,0 +1,151 @@
+"""
+Süreç içi (in-process) cache yardımcıları: TTL'li LRU ve single-flight.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+MISSING: Any = object()
+
+
+class TTLCache:
+    """
+    Boyutu sınırlı, girdi başına son kullanma süreli LRU cache.
+    Tek event loop içinde kullanılır; kilit gerektirmez.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    """
+    Aynı anahtar için eşzamanlı çağrıları tek bir çalışmada birleştirir.
+    İş ayrı bir task olarak çalışır; ilk çağıran iptal edilse bile
+    bekleyen diğer çağıranlar sonucu alır.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Tüm bekleyenler iptal edildiyse "exception was never retrieved" uyarısını önle
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class LoadingCache:
+    """
+    TTLCache + SingleFlight: get_or_load ile okunan cache.
+    Boş sonuçlar ("bulunamadı") daha kısa `negative_ttl` ile saklanır;
+    bir anahtar için aynı anda yalnızca bir yükleme çalışır (stampede koruması).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        negative_ttl: float,
+        is_negative: Callable[[Any], bool] = lambda value: not value,
+    ):
+        self.cache = TTLCache(maxsize, ttl)
+        self.negative_ttl = negative_ttl
+        self.is_negative = is_negative
+        self._flight = SingleFlight()
+        self.loads = 0
+        self.negative_hits = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        value = self.cache.get(key)
+        if value is not MISSING:
+            if self.is_negative(value):
+                self.negative_hits += 1
+            return value
+
+        async def load() -> T:
+            result = await loader()
+            self.loads += 1
+            self.cache.set(key, result, ttl=self.negative_ttl if self.is_negative(result) else None)
+            return result
+
+        return await self._flight.do(key, load)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.cache.pop(key)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "negative_hits": self.negative_hits,
+            "loads": self.loads,
+            "coalesced": self._flight.coalesced,
+        }
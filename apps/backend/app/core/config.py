@@ -10,15 +10,100 @@ class Settings(BaseSettings):
     api_port: int = 8000
 
     database_url: str
+    # Bağlantı havuzu (worker başına); boyutu worker sayısı ve DB max_connections'a göre ayarlayın
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # Saniye; -1 kapatır
+    db_pool_pre_ping: bool = True  # False: checkout başına ek round trip yok, kopan bağlantılar recycle/hata ile düşer
+    db_prepared_statement_cache_size: int = 100  # asyncpg bağlantı başına; pgbouncer (transaction mode) için 0
+    # Read replica (opsiyonel): salt okuma endpoint'leri buraya yönlendirilir
+    database_read_url: str | None = None
+    replica_max_lag_seconds: float = 5.0  # Bu gecikmenin üstünde okumalar primary'ye döner
+    replica_lag_check_interval: float = 5.0
+    read_your_writes_seconds: float = 10.0  # Yazan kullanıcı bu süre boyunca primary'den okur
+    # Koşullu GET / yanıt cache'i
+    response_cache_max_entries: int = 2048
+    response_cache_ttl_seconds: float = 300  # Rastgele kelime listeleri de en fazla bu kadar sabit kalır
+    content_version_check_interval: float = 30.0
+    # Bellekteki içerik kataloğu (kelime/cümle); kapalıysa veya yüklenemezse SQL kullanılır
+    content_catalog_enabled: bool = True
+    content_catalog_path: str | None = None  # Varsayılan: data/content_catalog.bin
+    daily_stats_max_days: int = 366  # /api/statistics/daily en geniş aralık
+    # Liderlik tablosu
+    leaderboard_rebuild_interval: float = 300.0  # Diğer worker'ların güncellemelerini almak için
+    leaderboard_max_limit: int = 100
+    vocabulary_browse_max_limit: int = 200
+    vocabulary_search_max_limit: int = 50
+    vocabulary_search_max_distance: int = 2  # Uzun sorgularda izin verilen yazım hatası (1 veya 2)
+    # Yüzdelik taslakları (KLL)
+    percentile_sketch_k: int = 200  # Sıra hatası ~%1
+    percentile_flush_interval: float = 60.0
+    percentile_min_samples: int = 20  # Daha az örnekte yüzdelik döndürülmez
     supabase_service_role: str | None = None
     supabase_jwt_secret: str | None = None
     access_token_expire_minutes: int = 60
     jwt_algorithm: str = "HS256"
+    jwt_claims_cache_size: int = 10000  # Doğrulanmış token claim'leri (token hash'i ile)
+    jwt_claims_cache_max_ttl: float = 3600.0  # exp'ten bağımsız üst sınır
+    known_users_cache_size: int = 50000  # users tablosunda var olduğu bilinen id'ler
+    known_users_cache_ttl: float = 3600.0
+
+    # Harici veri kaynakları (Tatoeba vb.) için paylaşılan HTTP client
+    tatoeba_base_url: str = "https://tatoeba.org/api/v0"
+    tatoeba_offline: bool = False  # True: data/tur.txt üzerinden ağsız fixture transport
+    example_source: str = "tatoeba"  # "tatoeba" (API) | "local" (indekslenmiş yerel korpus)
+    corpus_path: str | None = None  # Varsayılan: data/tur.txt
+    corpus_index_dir: str | None = None  # Varsayılan: data/index
+    data_source_default_deadline: float = 2.0  # Saniye; süresi dolan kaynak sonuçsuz sayılır
+    data_source_deadlines: dict[str, float] = {}  # Kaynak bazında override, ör. {"tatoeba": 1.5}
+    example_cache_max_entries: int = 10000
+    example_cache_ttl_seconds: float = 3600.0
+    example_cache_negative_ttl_seconds: float = 300.0  # "Sonuç yok" yanıtları daha kısa tutulur
+    http_http2: bool = True
+    http_max_connections: int = 50
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_per_host_concurrency: int = 8
+    http_connect_timeout: float = 3.0
+    http_read_timeout: float = 10.0
+    http_max_retries: int = 2
+    http_retry_base_delay: float = 0.2
+
+    # /api/quiz/questions/stream için paralel soru üretimi (her biri ayrı DB bağlantısı kullanır)
+    quiz_generation_concurrency: int = 4
     
     # AI API Keys (optional)
     openai_api_key: str | None = None
     anthropic_api_key: str | None = None
 
+    # AI client ayarları (base_url boşsa SDK varsayılanı kullanılır)
+    openai_base_url: str | None = None
+    anthropic_base_url: str | None = None
+    ai_max_concurrency: int = 8  # Sağlayıcı başına eşzamanlı istek limiti
+    ai_max_retries: int = 3  # Rate limit / geçici hata durumunda tekrar sayısı
+    ai_retry_base_delay: float = 0.5  # Saniye, üstel artar
+    ai_retry_max_delay: float = 8.0
+    ai_request_timeout: float = 30.0
+    openai_model: str = "gpt-3.5-turbo"
+    anthropic_model: str = "claude-3-haiku-20240307"
+    ai_temperature: float = 0.7
+    ai_cache_ttl_seconds: float = 3600.0  # Aynı prompt'un yanıtı bu süre boyunca tekrar kullanılır
+    ai_cache_max_entries: int = 1024
+
+    # Sağlayıcı yönlendirme / hedged istekler
+    ai_hedge_enabled: bool = True
+    ai_hedge_default_delay: float = 2.0  # p95 için yeterli örnek yokken
+    ai_hedge_min_delay: float = 0.2
+    ai_hedge_max_delay: float = 5.0
+    ai_router_ewma_alpha: float = 0.2
+    ai_router_latency_window: int = 128  # p95 hesabı için tutulan son gecikme örnekleri
+    ai_router_max_error_rate: float = 0.5  # Bu oranın üstünde sağlayıcı geçici olarak devre dışı
+    ai_router_cooldown_seconds: float = 30.0
+    ai_batch_size: int = 25  # Toplu üretimde istek başına eleman sayısı
+    ai_batch_max_followups: int = 3  # Eksik elemanlar için ek çağrı limiti
+    ai_batch_exclude_limit: int = 200  # Prompt'a eklenen "tekrar etme" listesi uzunluğu
+
 
 @lru_cache
 def get_settings() -> Settings:
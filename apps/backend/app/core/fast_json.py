@@ -0,0 +1,39 @@
+"""
+Hızlı JSON yanıt yolu (opt-in, `native=true`).
+
+Endpoint Pydantic modeli kurmak yerine dict/list döndürür; gövde orjson ile
+(kurulu değilse stdlib json ile) tek seferde serileştirilir. Response nesnesi
+döndürüldüğü için FastAPI response_model doğrulamasını tekrar çalıştırmaz.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Opsiyonel bağımlılık (pip install orjson)
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
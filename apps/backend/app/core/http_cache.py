@@ -0,0 +1,94 @@
+"""
+Koşullu GET (ETag / If-None-Match) ve sürüm anahtarlı yanıt cache'i.
+
+Yanıtlar (endpoint, parametreler, veri sürümü) anahtarıyla serileştirilmiş
+halde saklanır. Veri sürümleri:
+  - içerik: content_meta tablosundaki global sürüm, en fazla
+    `content_version_check_interval` saniyede bir okunur
+  - kullanıcı istatistikleri: user_stats satırından (quiz_count, updated_at),
+    istek başına okunur (app.services.user_stats.get_stats_version); hangi
+    worker gönderimi işlemiş olursa olsun sonraki okuma yeni sürümü görür
+"""
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.cache import MISSING, SingleFlight, TTLCache
+from app.core.config import settings
+from app.db import queries
+from app.db.session import async_session
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = "private, no-cache"  # Tarayıcı saklayabilir ama her seferinde doğrulamalı
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match başlığı bu ETag'i (veya *) içeriyor mu; zayıf karşılaştırma."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ContentVersion:
+    """content_meta'daki global içerik sürümünün periyodik olarak yenilenen kopyası."""
+
+    def __init__(self):
+        self.version = "0"
+        self._checked_at = 0.0
+        self._flight = SingleFlight()
+
+    async def get(self) -> str:
+        if time.monotonic() - self._checked_at < settings.content_version_check_interval:
+            return self.version
+        return await self._flight.do("content", self._refresh)
+
+    async def _refresh(self) -> str:
+        try:
+            async with async_session() as session:
+                version = (await session.execute(queries.CONTENT_VERSION)).scalar()
+            self.version = str(version or 0)
+        except Exception as e:
+            logger.warning(f"Content version check failed, keeping {self.version}: {e}")
+        self._checked_at = time.monotonic()
+        return self.version
+
+
+class ResponseCache:
+    """
+    Serileştirilmiş JSON gövdeleri ve ETag'leri; anahtar veri sürümünü içerir.
+    ETag gövdeden türetilir: cache'ten düşen ama değişmemiş yanıt yine 304 alır.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TTLCache(maxsize, ttl)
+        self.not_modified = 0
+
+    async def respond(self, request: Request, key: tuple, build: Callable[[], Awaitable[bytes]]) -> Response:
+        entry = self.cache.get(key)
+        if entry is MISSING:
+            body = await build()
+            entry = (f'"{hashlib.sha1(body).hexdigest()[:20]}"', body)
+            self.cache.set(key, entry)
+        etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if etag_matches(request, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "not_modified": self.not_modified}
+
+
+content_version = ContentVersion()
+response_cache = ResponseCache(settings.response_cache_max_entries, settings.response_cache_ttl_seconds)
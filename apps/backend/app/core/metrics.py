@@ -0,0 +1,200 @@
+"""
+Süreç içi istek metrikleri ve Prometheus text formatında dışa aktarım.
+
+Route başına istek/status sayaçları ile toplam süre, DB süresi ve model
+(LLM) süresi histogramları tutulur. Bucket'lar önceden tanımlıdır; istek
+başına yalnızca birkaç sayaç artırılır.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+# İstek boyunca biriken [db_saniye, model_saniye]; middleware her istekte yeni liste kurar
+_request_timings: ContextVar[Optional[list]] = ContextVar("request_timings", default=None)
+
+
+def record_db_time(seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[0] += seconds
+
+
+def record_model_time(seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[1] += seconds
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # Son eleman: +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RouteMetrics:
+    __slots__ = ("statuses", "latency", "db", "model")
+
+    def __init__(self):
+        self.statuses: dict[int, int] = {}
+        self.latency = Histogram()
+        self.db = Histogram()
+        self.model = Histogram()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def format_metric(name: str, metric_type: str, help_text: str, samples: Iterable[tuple[dict, float]]) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+def histogram_lines(name: str, help_text: str, series: Iterable[tuple[dict, Histogram]]) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, hist in series:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, hist.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {hist.count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {hist.total}")
+        lines.append(f"{name}_count{format_labels(labels)} {hist.count}")
+    return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def observe(self, method: str, route: str, status: int, elapsed: float, db_time: float, model_time: float) -> None:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.latency.observe(elapsed)
+        metrics.db.observe(db_time)
+        metrics.model.observe(model_time)
+
+    def register_collector(self, collector: Callable[[], list[str]]) -> None:
+        """Scrape anında çağrılır; Prometheus text satırları döner (ör. havuz veya cache metrikleri)."""
+        self._collectors.append(collector)
+
+    def _histogram_lines(self, name: str, help_text: str, attr: str) -> list[str]:
+        return histogram_lines(
+            name,
+            help_text,
+            (
+                ({"method": method, "route": route}, getattr(metrics, attr))
+                for (method, route), metrics in sorted(self.routes.items())
+            ),
+        )
+
+    def render(self) -> str:
+        lines = format_metric(
+            "lexavia_http_requests_total",
+            "counter",
+            "HTTP requests by route, method and status code.",
+            (
+                ({"method": method, "route": route, "status": status}, count)
+                for (method, route), metrics in sorted(self.routes.items())
+                for status, count in sorted(metrics.statuses.items())
+            ),
+        )
+        lines += self._histogram_lines(
+            "lexavia_http_request_duration_seconds", "End-to-end request latency.", "latency"
+        )
+        lines += self._histogram_lines(
+            "lexavia_http_db_duration_seconds", "Time spent executing SQL per request.", "db"
+        )
+        lines += self._histogram_lines(
+            "lexavia_http_model_duration_seconds", "Time spent waiting on AI models per request.", "model"
+        )
+        for collector in self._collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Saf ASGI middleware: her HTTP isteğini route şablonu (ör. /api/ml/due-reviews/{user_id}) ile kaydeder."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = [0.0, 0.0]
+        token = _request_timings.set(timings)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_timings.reset(token)
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                getattr(route, "path", None) or UNMATCHED_ROUTE,
+                status_code,
+                elapsed,
+                timings[0],
+                timings[1],
+            )
+
+
+def instrument_engine(engine) -> None:
+    """SQLAlchemy (async) engine'ine SQL süresini ölçen event listener'ları ekler."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("query_started")
+        if stack:
+            record_db_time(time.perf_counter() - stack.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        stack = conn.info.get("query_started") if conn is not None else None
+        if stack:
+            record_db_time(time.perf_counter() - stack.pop())
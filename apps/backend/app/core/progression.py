@@ -0,0 +1,37 @@
+"""
+Seviye eşikleri ve XP'ye göre seviye hesabı (XP = toplam doğru cevap).
+"""
+from typing import Optional
+
+LEVEL_THRESHOLDS = {
+    "A1": 0,
+    "A2": 50,
+    "B1": 150,
+    "B2": 300,
+    "C1": 600,
+    "C2": 1000,
+}
+LEVEL_ORDER = list(LEVEL_THRESHOLDS)
+
+
+def level_for_xp(current_level: str, xp: int) -> str:
+    """
+    XP'nin ulaştığı en yüksek seviye; kullanıcı hiçbir zaman seviye düşmez.
+    Quiz gönderiminde aynı kural SQL'de uygulanır (app.services.quiz_submission).
+    """
+    new_level = current_level
+    for level, threshold in LEVEL_THRESHOLDS.items():
+        if xp >= threshold and threshold > LEVEL_THRESHOLDS.get(new_level, 0):
+            new_level = level
+    return new_level
+
+
+def next_level_info(level: str) -> tuple[Optional[str], int]:
+    """(sonraki seviye, o seviyenin XP eşiği); son seviyede veya bilinmeyen seviyede (None, 0)."""
+    if level not in LEVEL_ORDER:
+        return None, 0
+    idx = LEVEL_ORDER.index(level)
+    if idx == len(LEVEL_ORDER) - 1:
+        return None, 0
+    next_level = LEVEL_ORDER[idx + 1]
+    return next_level, LEVEL_THRESHOLDS[next_level]
@@ -0,0 +1,102 @@
+"""
+Akış (streaming) kantil taslağı: KLL (Karnin-Lang-Liberty).
+
+Sabit bellekle (~k log(n/k) değer) yaklaşık sıra/kantil sorgularını yanıtlar;
+iki taslak birleştirilebilir (merge), bu sayede worker'lar kendi
+güncellemelerini ortak kayda ekleyebilir. Sıra hatası yaklaşık O(1/k).
+"""
+import math
+import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Optional
+
+CAPACITY_DECAY = 2 / 3
+MIN_CAPACITY = 2
+
+
+class KLLSketch:
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.levels: list[list[float]] = [[]]  # levels[h] öğelerinin ağırlığı 2^h
+        self._rng = random.Random(seed)
+        self._cdf: Optional[tuple[list[float], list[int]]] = None
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(MIN_CAPACITY, math.ceil(self.k * CAPACITY_DECAY ** depth))
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        for h in range(len(self.levels)):
+            if len(self.levels[h]) < self._capacity(h):
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+            items = sorted(self.levels[h])
+            # Tek sayıda öğe varsa biri bu seviyede kalır; kalan çiftlerin rastgele yarısı üste çıkar
+            leftover = [items.pop()] if len(items) % 2 else []
+            self.levels[h + 1].extend(items[self._rng.randint(0, 1)::2])
+            self.levels[h] = leftover
+            if self._size() <= self._max_size():
+                break
+
+    def update(self, value: float) -> None:
+        self.levels[0].append(float(value))
+        self.n += 1
+        self._cdf = None
+        if self._size() > self._max_size():
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.n += other.n
+        self._cdf = None
+        while self._size() > self._max_size():
+            self._compress()
+
+    def _sorted_weights(self) -> tuple[list[float], list[int]]:
+        if self._cdf is None:
+            pairs = sorted((value, 1 << h) for h, items in enumerate(self.levels) for value in items)
+            self._cdf = ([value for value, _ in pairs], list(accumulate(weight for _, weight in pairs)))
+        return self._cdf
+
+    def rank(self, value: float) -> Optional[float]:
+        """`value`'dan küçük öğelerin (yaklaşık) oranı, 0..1; taslak boşsa None."""
+        values, cumulative = self._sorted_weights()
+        if not values:
+            return None
+        idx = bisect_left(values, value)
+        return (cumulative[idx - 1] if idx else 0) / cumulative[-1]
+
+    def quantile(self, q: float) -> Optional[float]:
+        values, cumulative = self._sorted_weights()
+        if not values:
+            return None
+        target = q * cumulative[-1]
+        return values[min(bisect_left(cumulative, target), len(values) - 1)]
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "n": self.n, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(k=data["k"])
+        sketch.n = data["n"]
+        sketch.levels = [list(map(float, items)) for items in data["levels"]] or [[]]
+        return sketch
+
+    def copy(self) -> "KLLSketch":
+        return KLLSketch.from_dict(self.to_dict())
+
+    def __len__(self) -> int:
+        return self.n
@@ -0,0 +1,148 @@
+"""
+Sık çalışan SQL ifadeleri: modül yüklenirken bir kez oluşturulur.
+
+Handler içinde her çağrıda text()/select() kurmak yerine buradaki sabitler
+kullanılır; SQLAlchemy derlenmiş hâli cache anahtarıyla tekrar kullanır ve
+SQL metni sabit kaldığı için asyncpg de bağlantı başına bir kez prepare eder
+(bkz. settings.db_prepared_statement_cache_size).
+"""
+from functools import lru_cache
+
+from sqlalchemy import bindparam, select, text
+
+from app.models.review_schedule import ReviewSchedule
+from app.models.vocabulary import VocabularyWord
+
+# Kullanıcının vadesi gelmiş tekrarları (quiz kelime seçimi)
+DUE_REVIEW_WORDS = text("""
+    SELECT v.id, v.word, v.translation, v.level, v.category
+    FROM review_schedules rs
+    JOIN vocabulary_words v ON rs.word_id = v.id
+    WHERE rs.next_review <= NOW() AND rs.user_id = :uid
+    ORDER BY rs.next_review ASC
+    LIMIT :lim
+""")
+
+# Kullanıcının henüz programında olmayan rastgele kelimeler (anti-join)
+NEW_WORDS_FOR_USER = text("""
+    SELECT v.id, v.word, v.translation, v.level, v.category
+    FROM vocabulary_words v
+    LEFT JOIN review_schedules rs ON v.id = rs.word_id AND rs.user_id = :uid
+    WHERE v.level = :level AND rs.id IS NULL
+    ORDER BY RANDOM()
+    LIMIT :lim
+""")
+
+# Kelimeye bağlı rastgele bir örnek cümle (boşluk doldurma bağlamı)
+WORD_CONTEXT_SENTENCE = text("""
+    SELECT s.english_text, s.turkish_text
+    FROM vocabulary_words v
+    JOIN word_sentences ws ON v.id = ws.word_id
+    JOIN sentences s ON ws.sentence_id = s.id
+    WHERE v.word = :word
+    ORDER BY RANDOM()
+    LIMIT 1
+""")
+
+# Bağlantı yoksa kelimeyi geçen herhangi bir cümle (\y: postgres kelime sınırı)
+SENTENCE_BY_PATTERN = text("""
+    SELECT english_text, turkish_text
+    FROM sentences
+    WHERE english_text ~* :pattern
+    ORDER BY RANDOM()
+    LIMIT 1
+""")
+
+DISTRACTOR_WORDS = text("SELECT word FROM vocabulary_words WHERE word != :word ORDER BY RANDOM() LIMIT 3")
+
+# Seviyeye göre rastgele kelimeler, her biri bir örnek cümleyle. Rastgele
+# sıralama yalnızca (level, id) indeksinden okunan id'ler üzerinde yapılır;
+# örnek cümle vocabulary_words.example_sentence'ta hazır tutulur.
+RANDOM_VOCABULARY = text("""
+    WITH picked AS (
+        SELECT id FROM vocabulary_words
+        WHERE level = :level
+        ORDER BY RANDOM()
+        LIMIT :limit
+    )
+    SELECT v.id, v.word, v.translation, v.level, v.category, v.example_sentence, v.created_at
+    FROM picked JOIN vocabulary_words v ON v.id = picked.id
+""")
+
+# Her kelimenin örnek cümlesini (en küçük id'li bağlı cümle) vocabulary_words'e
+# yazar; bağlantısı olmayan kelimelerin kendi example_sentence'ı korunur.
+# word_sentences'ı değiştiren importer'lar içerik sürümünü artırmadan önce çalıştırır.
+REFRESH_PRIMARY_EXAMPLES = text("""
+    UPDATE vocabulary_words v
+    SET primary_example_sentence_id = first.sentence_id, example_sentence = first.english_text
+    FROM (
+        SELECT DISTINCT ON (ws.word_id) ws.word_id, s.id AS sentence_id, s.english_text
+        FROM word_sentences ws JOIN sentences s ON s.id = ws.sentence_id
+        ORDER BY ws.word_id, s.id
+    ) first
+    WHERE v.id = first.word_id
+      AND v.primary_example_sentence_id IS DISTINCT FROM first.sentence_id
+""")
+
+
+@lru_cache(maxsize=None)
+def browse_vocabulary(by_level: bool, by_category: bool, with_examples: bool):
+    """
+    Keyset sayfalama (id > :after_id ORDER BY id). Filtre kombinasyonu başına
+    sabit bir ifade döner; örneksiz sorgular (level, id) / (category, id)
+    kapsayan indekslerinden index-only scan ile okunur.
+    """
+    columns = [VocabularyWord.id, VocabularyWord.word, VocabularyWord.translation,
+               VocabularyWord.level, VocabularyWord.category]
+    if with_examples:
+        columns.append(VocabularyWord.example_sentence)
+    stmt = select(*columns).where(VocabularyWord.id > bindparam("after_id"))
+    if by_level:
+        stmt = stmt.where(VocabularyWord.level == bindparam("level"))
+    if by_category:
+        stmt = stmt.where(VocabularyWord.category == bindparam("category"))
+    return stmt.order_by(VocabularyWord.id).limit(bindparam("limit"))
+
+WORD_EXAMPLE_SENTENCE = text("""
+    SELECT english_text
+    FROM sentences
+    JOIN word_sentences ON sentences.id = word_sentences.sentence_id
+    JOIN vocabulary_words ON word_sentences.word_id = vocabulary_words.id
+    WHERE vocabulary_words.word = :word
+    LIMIT 1
+""")
+
+WORD_BY_TEXT = select(VocabularyWord).where(VocabularyWord.word == bindparam("word"))
+
+# /api/ml/due-reviews: ORM satırları (ReviewSchedule, VocabularyWord)
+DUE_REVIEWS_WITH_WORDS = (
+    select(ReviewSchedule, VocabularyWord)
+    .join(VocabularyWord, ReviewSchedule.word_id == VocabularyWord.id)
+    .where(ReviewSchedule.user_id == bindparam("uid"), ReviewSchedule.next_review <= bindparam("now"))
+    .order_by(ReviewSchedule.next_review)
+    .limit(50)
+)
+
+# Global içerik sürümü (ETag'ler için); içerik import eden scriptler artırır
+CONTENT_VERSION = text("SELECT version FROM content_meta WHERE key = 'content'")
+
+BUMP_CONTENT_VERSION = text("""
+    INSERT INTO content_meta (key, version, updated_at) VALUES ('content', 1, NOW())
+    ON CONFLICT (key) DO UPDATE SET version = content_meta.version + 1, updated_at = NOW()
+""")
+
+# Günlük özetler: (user_id, day) primary key üzerinde tek aralık taraması,
+# artı güncel seri için kullanıcının en son günü (latest = TRUE)
+DAILY_STATS_RANGE = text("""
+    SELECT day, quizzes, questions, correct, reviews, streak, FALSE AS latest
+    FROM user_daily_stats
+    WHERE user_id = :uid AND day BETWEEN :start AND :end
+    UNION ALL
+    (
+        SELECT day, quizzes, questions, correct, reviews, streak, TRUE AS latest
+        FROM user_daily_stats
+        WHERE user_id = :uid
+        ORDER BY day DESC
+        LIMIT 1
+    )
+""")
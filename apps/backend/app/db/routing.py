@@ -0,0 +1,190 @@
+"""
+Okuma isteklerinin primary / read replica arasında yönlendirilmesi.
+
+Replica yalnızca yapılandırılmışsa ve replikasyon gecikmesi limitin altındaysa
+kullanılır. Yeni yazı yapan kullanıcı (quiz gönderimi vb.) kısa bir süre
+primary'den okur (read-your-writes).
+
+Birden fazla worker varsa sonraki istek başka bir sürece düşebilir; bu yüzden
+yazı zamanı istemciyle taşınır: yazı yapan yanıta X-Last-Write header'ı ve
+aynı isimli cookie eklenir, istemci header'ı sonraki isteklerde geri gönderir.
+Süreç içi kayıt yalnızca header/cookie taşımayan istemciler için yedektir.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import AsyncGenerator, Optional
+from uuid import UUID
+
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.auth import get_optional_user_id
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.metrics import format_metric, registry
+from app.db.session import async_read_session, async_session, engine, read_engine
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+LAST_WRITE_HEADER = "X-Last-Write"
+LAST_WRITE_COOKIE = "lexavia_last_write"
+CLOCK_SKEW_SECONDS = 1.0  # Worker saatleri arasındaki küçük farklara tolerans
+
+_recent_writers = TTLCache(maxsize=100000, ttl=settings.read_your_writes_seconds)
+# İstek boyunca yapılan yazıların zamanları; ReadYourWritesMiddleware her istekte yeni liste kurar
+_request_writes: ContextVar[Optional[list]] = ContextVar("request_writes", default=None)
+routing_stats = {"replica": 0, "primary": 0, "read_your_writes": 0, "lagging": 0}
+
+
+def mark_user_write(user_id: UUID | str) -> None:
+    """Kullanıcının az önce yazdığını kaydeder; sonraki okumaları bir süre primary'ye gider."""
+    _recent_writers.set(str(user_id), True)
+    writes = _request_writes.get()
+    if writes is not None:
+        writes.append(time.time())
+
+
+def _parse_last_write(request: Request) -> Optional[float]:
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _wrote_recently(written_at: Optional[float]) -> bool:
+    if written_at is None:
+        return False
+    age = time.time() - written_at
+    return -CLOCK_SKEW_SECONDS <= age < settings.read_your_writes_seconds
+
+
+class ReadYourWritesMiddleware:
+    """Saf ASGI middleware: istek sırasında yazı yapıldıysa yanıta son yazı zamanını ekler."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes: list[float] = []
+        token = _request_writes.set(writes)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and writes:
+                value = f"{max(writes):.3f}"
+                max_age = int(settings.read_your_writes_seconds) + 1
+                message["headers"] = list(message.get("headers", [])) + [
+                    (LAST_WRITE_HEADER.lower().encode(), value.encode()),
+                    (b"set-cookie", f"{LAST_WRITE_COOKIE}={value}; Max-Age={max_age}; Path=/; SameSite=Lax".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(token)
+
+
+class ReplicaLagMonitor:
+    """Replica gecikmesini en fazla `replica_lag_check_interval` saniyede bir ölçer."""
+
+    def __init__(self):
+        self.lag: float | None = None
+        self.healthy = True
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def replica_ok(self) -> bool:
+        if time.monotonic() - self._checked_at < settings.replica_lag_check_interval or self._lock.locked():
+            return self.healthy
+        async with self._lock:
+            try:
+                async with read_engine.connect() as conn:
+                    self.lag = float((await conn.execute(REPLICA_LAG_SQL)).scalar() or 0)
+                self.healthy = self.lag <= settings.replica_max_lag_seconds
+                if not self.healthy:
+                    logger.warning(f"Read replica lagging {self.lag:.1f}s, routing reads to primary")
+            except Exception as e:
+                logger.warning(f"Replica lag check failed, routing reads to primary: {e}")
+                self.lag = None
+                self.healthy = False
+            self._checked_at = time.monotonic()
+        return self.healthy
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+async def read_sessionmaker_for(
+    user_id: UUID | str | None = None,
+    written_at: Optional[float] = None,
+) -> async_sessionmaker:
+    """
+    Bu okuma için kullanılacak session factory (replica veya primary).
+    `written_at`: istemcinin gönderdiği son yazı zamanı (X-Last-Write), varsa.
+    """
+    if read_engine is engine:
+        return async_session
+    if _wrote_recently(written_at) or (
+        user_id is not None and _recent_writers.get(str(user_id)) is not MISSING
+    ):
+        routing_stats["read_your_writes"] += 1
+        routing_stats["primary"] += 1
+        return async_session
+    if not await lag_monitor.replica_ok():
+        routing_stats["lagging"] += 1
+        routing_stats["primary"] += 1
+        return async_session
+    routing_stats["replica"] += 1
+    return async_read_session
+
+
+async def get_read_session(
+    request: Request,
+    user_id: UUID | None = Depends(get_optional_user_id),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Salt okuma endpoint'leri için session. Read-your-writes kontrolü için
+    X-Last-Write header'ı / cookie'si, ayrıca token'daki ya da path'teki
+    {user_id} kullanılır.
+    """
+    factory = await read_sessionmaker_for(
+        user_id or request.path_params.get("user_id"),
+        _parse_last_write(request),
+    )
+    try:
+        async with factory() as session:
+            yield session
+    except Exception as e:
+        logger.error(f"Database connection error: {e}")
+        raise
+
+
+def _routing_collector() -> list[str]:
+    lines = format_metric(
+        "lexavia_db_read_routing_total", "counter", "Read-only sessions by target and reason.",
+        [({"decision": key}, value) for key, value in routing_stats.items()],
+    )
+    if read_engine is not engine:
+        lines += format_metric(
+            "lexavia_db_replica_lag_seconds", "gauge", "Last measured replica replay lag.",
+            [({}, lag_monitor.lag if lag_monitor.lag is not None else float("nan"))],
+        )
+    return lines
+
+
+registry.register_collector(_routing_collector)
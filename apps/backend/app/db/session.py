@@ -1,9 +1,13 @@
 import logging
+import time
 from typing import AsyncGenerator
 
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.metrics import Histogram, format_metric, histogram_lines, instrument_engine, registry
 
 logger = logging.getLogger(__name__)
 
@@ -19,14 +23,61 @@ if not settings.database_url:
 db_url_masked = settings.database_url.split("@")[-1] if "@" in settings.database_url else "***"
 logger.info(f"Connecting to database: ***@{db_url_masked}")
 
-try:
-    engine = create_async_engine(
-        settings.database_url,
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Bağlantı alma (checkout) bekleme süresini ve timeout'ları ölçen havuz (metrikler havuz başına)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+        self.checkout_timeouts = 0
+
+    def recreate(self):
+        # engine.dispose() havuzu yeniden kurar; sayaçlar sıfırlanmasın
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        pool.checkout_timeouts = self.checkout_timeouts
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+
+def _engine_kwargs() -> dict:
+    return dict(
         future=True,
         echo=False,
-        pool_pre_ping=True,  # Verify connections before using
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        # Pre-ping her checkout'ta ek round trip demek; recycle ile birlikte kapatılabilir
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
     )
+
+
+try:
+    engine = create_async_engine(settings.database_url, **_engine_kwargs())
     async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    instrument_engine(engine)  # Per-request DB time for /api/metrics
+
+    # Read replica (optional). Without DATABASE_READ_URL reads share the primary engine.
+    if settings.database_read_url:
+        read_engine = create_async_engine(settings.database_read_url, **_engine_kwargs())
+        async_read_session = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+        instrument_engine(read_engine)
+    else:
+        read_engine = engine
+        async_read_session = async_session
 except Exception as e:
     logger.error(f"Failed to create database engine: {e}")
     raise
@@ -41,3 +92,23 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         raise
 
 
+def _pool_collector() -> list[str]:
+    pools = [({"engine": "primary"}, engine.sync_engine.pool)]
+    if read_engine is not engine:
+        pools.append(({"engine": "replica"}, read_engine.sync_engine.pool))
+    lines = format_metric("lexavia_db_pool_size", "gauge", "Configured pool size.", [(l, p.size()) for l, p in pools])
+    lines += format_metric("lexavia_db_pool_checked_out", "gauge", "Connections currently in use.", [(l, p.checkedout()) for l, p in pools])
+    lines += format_metric("lexavia_db_pool_checked_in", "gauge", "Idle connections in the pool.", [(l, p.checkedin()) for l, p in pools])
+    lines += format_metric("lexavia_db_pool_overflow", "gauge", "Connections opened beyond pool_size.", [(l, p.overflow()) for l, p in pools])
+    lines += format_metric(
+        "lexavia_db_pool_checkout_timeouts_total", "counter", "Checkouts that hit pool_timeout.",
+        [(l, p.checkout_timeouts) for l, p in pools],
+    )
+    lines += histogram_lines(
+        "lexavia_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.",
+        [(l, p.checkout_wait) for l, p in pools],
+    )
+    return lines
+
+
+registry.register_collector(_pool_collector)
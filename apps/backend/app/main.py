@@ -1,30 +1,50 @@
+import asyncio
 import logging
 import json
 import random
 from uuid import UUID
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import select, text
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
-from app.core.auth import get_current_user_id, get_or_create_user
-from app.db.session import get_session
+from app.core.auth import get_current_db_user_id, get_current_user_id
+from app.core.config import settings
+from app.core.fast_json import FastJSONResponse, dumps as fast_dumps
+from app.core.http_cache import content_version, response_cache
+from app.core.progression import next_level_info
+from app.core.metrics import MetricsMiddleware, format_metric, registry as metrics_registry
+from app.db import queries
+from app.db.routing import (
+    LAST_WRITE_HEADER,
+    ReadYourWritesMiddleware,
+    get_read_session,
+    mark_user_write,
+    read_sessionmaker_for,
+)
+from app.db.session import async_session, get_session
 from app.models.learning_goal import LearningGoal
 from app.models.quiz import QuizQuestion, QuizSession
-from app.models.user import User
-from app.models.vocabulary import VocabularyWord
 from app.models.review_schedule import ReviewSchedule
 from app.schemas.learning_goal import LearningGoalCreate, LearningGoalRead
 from app.schemas.quiz import (
     QuizQuestionList,
+    QuizQuestionNativeList,
     QuizQuestionRead,
     QuizSessionCreate,
     QuizSessionRead,
 )
-from app.schemas.vocabulary import VocabularyWordList, VocabularyWordRead
+from app.schemas.vocabulary import (
+    VocabularyBrowseItem,
+    VocabularyBrowsePage,
+    VocabularySearchResponse,
+    VocabularyWordList,
+    VocabularyWordRead,
+)
 
 # New core logic
 from app.core.spaced_repetition import SpacedRepetitionEngine
@@ -38,6 +58,14 @@ logger = logging.getLogger(__name__)
 
 from contextlib import asynccontextmanager
 from app.services.ai_generator import ai_generator
+from app.services.ai_service import ai_service
+from app.services.data_source import data_source_service, example_cache
+from app.services.content_catalog import content_catalog
+from app.services.leaderboard import leaderboard
+from app.services.percentiles import percentile_service
+from app.services.vocabulary_search import vocabulary_search
+from app.services.quiz_submission import submit_quiz
+from app.services import user_stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -46,8 +74,30 @@ async def lifespan(app: FastAPI):
         ai_generator.load_model()
     except Exception as e:
         logger.error(f"Startup AI load failed: {e}")
+    # Shared LLM clients (one connection pool per provider)
+    try:
+        await ai_service.startup()
+    except Exception as e:
+        logger.error(f"Startup AI client init failed: {e}")
+    try:
+        await data_source_service.startup()
+    except Exception as e:
+        logger.error(f"Startup data source init failed: {e}")
+    # In-memory words/sentences (falls back to SQL if this fails)
+    await content_catalog.startup()
+    try:
+        await vocabulary_search.warm()
+    except Exception as e:
+        logger.error(f"Startup search index build failed: {e}")
+    # XP rank trees (falls back to SQL counts if this fails)
+    await leaderboard.startup()
+    await percentile_service.startup()
     yield
-    # Cleanup if needed
+    await percentile_service.shutdown()
+    await leaderboard.shutdown()
+    await content_catalog.shutdown()
+    await ai_service.shutdown()
+    await data_source_service.aclose()
 
 app = FastAPI(title="Lexavia API", version="0.1.0", lifespan=lifespan)
 
@@ -58,7 +108,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
+# Read-your-writes marker travels with the client so every worker sees it
+app.add_middleware(ReadYourWritesMiddleware)
+# Outermost: per-route counts / latency / DB & model time for /api/metrics
+app.add_middleware(MetricsMiddleware)
 
 sr_engine = SpacedRepetitionEngine()
 
@@ -66,73 +121,57 @@ sr_engine = SpacedRepetitionEngine()
 async def health_check() -> dict[str, str]:
     return {"status": "ok", "mode": "ai_enhanced_flan_t5"}
 
-# ... (Previous endpoints) ...
+@app.get("/api/meta/stats", tags=["meta"])
+async def service_stats() -> dict:
+    """In-process cache / coalescing counters for the content services."""
+    return _collect_service_stats()
 
-async def _generate_single_question(session: AsyncSession, word: str, translation: str, level: str, category: str) -> dict:
-    """
-    Generates a single smart question using AI Generator.
-    """
-    # 0. Ensure translation
-    if not translation:
-        q_word = await session.execute(
-            select(VocabularyWord).where(VocabularyWord.word == word)
-        )
-        db_word = q_word.scalar_one_or_none()
-        if db_word:
-            translation = db_word.translation
-            
-    # 1. Fetch Context from DB (ESL/Curated Sentences)
-    query_context = text("""
-        SELECT s.english_text
-        FROM vocabulary_words v
-        JOIN word_sentences ws ON v.id = ws.word_id
-        JOIN sentences s ON ws.sentence_id = s.id
-        WHERE v.word = :word
-        ORDER BY RANDOM()
-        LIMIT 1
-    """)
-    result = await session.execute(query_context, {"word": word})
-    row = result.first()
-    
-    context_sentence = row[0] if row else f"The word is {word}."
-
-    # 2. Generate Question using AI
-    ai_result = ai_generator.generate_question(word, context_sentence, level)
-    
-    question_text = ai_result["question_text"]
-    explanation = ai_result["explanation"]
-
-    # 3. Distractors (Still need database for this)
-    query_dist = text("SELECT word FROM vocabulary_words WHERE word != :word ORDER BY RANDOM() LIMIT 3")
-    res_dist = await session.execute(query_dist, {"word": word})
-    dist_rows = res_dist.all()
-    
-    options = [word] + [r[0] for r in dist_rows]
-    while len(options) < 4:
-        options.append("other")
-    random.shuffle(options)
 
+def _collect_service_stats() -> dict:
     return {
-        "question_text": question_text,
-        "question_type": "multiple_choice",
-        "correct_answer": word,
-        "options": json.dumps(options),
-        "level": level,
-        "category": category,
-        "explanation": explanation
+        "ai": ai_service.stats(),
+        "data_sources": data_source_service.stats(),
+        "example_cache": example_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "content_catalog": content_catalog.stats(),
+        "vocabulary_search": vocabulary_search.stats(),
+        "leaderboard": leaderboard.stats(),
+        "percentiles": percentile_service.stats(),
     }
 
+
+def _flatten_stats(prefix: str, value, out: list) -> None:
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten_stats(f"{prefix}.{key}" if prefix else str(key), inner, out)
+    elif isinstance(value, (int, float)):  # bool included (healthy -> 1.0)
+        out.append(({"key": prefix}, float(value)))
+
+
+def _service_stats_collector() -> list[str]:
+    samples: list = []
+    _flatten_stats("", _collect_service_stats(), samples)
+    return format_metric("lexavia_service_stat", "gauge", "In-process service counters (see /api/meta/stats).", samples)
+
+
+metrics_registry.register_collector(_service_stats_collector)
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse, tags=["meta"])
+async def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # --- ONBOARDING & GOALS ---
 
 @app.post("/api/onboarding", response_model=LearningGoalRead, tags=["onboarding"])
 async def create_learning_goal(
     payload: LearningGoalCreate,
-    user: User = Depends(get_or_create_user),
+    user_id: UUID = Depends(get_current_db_user_id),
     session: AsyncSession = Depends(get_session),
 ) -> LearningGoalRead:
     try:
         goal = LearningGoal(
-            user_id=user.id,
+            user_id=user_id,
             target_language=payload.target_language,
             level=payload.level,
             daily_minutes=payload.daily_minutes,
@@ -140,7 +179,11 @@ async def create_learning_goal(
             focus_topics=payload.focus_topics,
         )
         session.add(goal)
+        await session.flush()
+        await user_stats.set_current_goal(session, user_id, goal)
         await session.commit()
+        mark_user_write(user_id)
+        leaderboard.set_level(user_id, goal.level)
         await session.refresh(goal)
         return LearningGoalRead.model_validate(goal.__dict__)
     except Exception as e:
@@ -151,39 +194,23 @@ async def create_learning_goal(
 @app.get("/api/learning-goals/latest", response_model=LearningGoalRead, tags=["learning-goals"])
 async def get_latest_learning_goal(
     user_id: UUID = Depends(get_current_user_id),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     try:
-        result = await session.execute(
-            select(LearningGoal).where(LearningGoal.user_id == str(user_id)).order_by(LearningGoal.created_at.desc()).limit(1)
-        )
-        goal = result.scalar_one_or_none()
+        stats, goal = await user_stats.get_stats_with_goal(session, user_id)
+        if goal is None:
+            # Stats row missing or without a current goal (e.g. not backfilled yet)
+            result = await session.execute(
+                select(LearningGoal).where(LearningGoal.user_id == str(user_id)).order_by(LearningGoal.created_at.desc()).limit(1)
+            )
+            goal = result.scalar_one_or_none()
         if not goal:
             raise HTTPException(status_code=404, detail="No goal found")
-            
-        # Calculate Progress
-        total_correct_res = await session.execute(
-            select(func.sum(QuizSession.correct_answers)).where(QuizSession.user_id == str(user_id))
-        )
-        current_xp = total_correct_res.scalar() or 0
-        
-        # Thresholds (Keep synchronized with create_quiz_session)
-        # XP = Total Correct Answers
-        LEVEL_THRESHOLDS = {
-            "A1": 0, "A2": 50, "B1": 150, "B2": 300, "C1": 600, "C2": 1000
-        }
-        LEVEL_ORDER = ["A1", "A2", "B1", "B2", "C1", "C2"]
-        
-        next_level = None
-        next_level_xp = 0
-        
-        current_level_idx = -1
-        if goal.level in LEVEL_ORDER:
-            current_level_idx = LEVEL_ORDER.index(goal.level)
-            
-        if current_level_idx != -1 and current_level_idx < len(LEVEL_ORDER) - 1:
-            next_level = LEVEL_ORDER[current_level_idx + 1]
-            next_level_xp = LEVEL_THRESHOLDS.get(next_level, 0)
+        if stats is None:
+            stats = await user_stats.compute_stats_from_history(session, user_id)
+
+        current_xp = stats.xp
+        next_level, next_level_xp = next_level_info(goal.level)
         
         # Construct response
         resp_dict = goal.__dict__.copy()
@@ -203,26 +230,37 @@ async def get_latest_learning_goal(
 
 @app.get("/api/vocabulary", response_model=VocabularyWordList, tags=["vocabulary"])
 async def get_vocabulary(
+    request: Request,
     level: str = "A1",
     limit: int = 10,
-    session: AsyncSession = Depends(get_session)
+    native: bool = False,
+    session: AsyncSession = Depends(get_read_session)
 ):
-    try:
-        # Use raw SQL to fetch random words with one example sentence each
-        query = text("""
-            SELECT v.id, v.word, v.translation, v.level, v.category,
-                   (SELECT s.english_text FROM sentences s 
-                    JOIN word_sentences ws ON s.id = ws.sentence_id 
-                    WHERE ws.word_id = v.id LIMIT 1) as example_sentence,
-                   v.created_at
-            FROM vocabulary_words v
-            WHERE v.level = :level
-            ORDER BY RANDOM()
-            LIMIT :limit
-        """)
-        
-        result = await session.execute(query, {"level": level, "limit": limit})
-        rows = result.all()
+    """native=true: same payload, serialized straight from rows without building Pydantic models."""
+    async def build() -> bytes:
+        # Random words with their denormalized example sentence. A catalog still
+        # rebuilding for a newer version is skipped: its rows would be cached under that version.
+        catalog = content_catalog.current
+        if catalog is not None and catalog.version == version:
+            rows = catalog.random_words(level, limit)
+        else:
+            result = await session.execute(queries.RANDOM_VOCABULARY, {"level": level, "limit": limit})
+            rows = result.all()
+
+        if native:
+            words = [
+                {
+                    "id": row.id,
+                    "word": row.word,
+                    "translation": row.translation,
+                    "level": row.level,
+                    "category": row.category,
+                    "example_sentence": row.example_sentence,
+                    "created_at": row.created_at,
+                }
+                for row in rows
+            ]
+            return fast_dumps({"words": words, "total": len(words)})
         
         vocab_list = []
         for row in rows:
@@ -236,12 +274,76 @@ async def get_vocabulary(
                 created_at=row.created_at
             ))
             
-        return VocabularyWordList(words=vocab_list, total=len(vocab_list))
+        return VocabularyWordList(words=vocab_list, total=len(vocab_list)).model_dump_json().encode()
+
+    try:
+        # Same sample per content version (and cache TTL); unchanged polls get 304
+        version = await content_version.get()
+        key = ("vocabulary", level, limit, native, version)
+        return await response_cache.respond(request, key, build)
         
     except Exception as e:
         logger.error(f"Error fetching vocabulary: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/vocabulary/browse", response_model=VocabularyBrowsePage, tags=["vocabulary"])
+async def browse_vocabulary(
+    request: Request,
+    after_id: int = 0,
+    level: str | None = None,
+    category: str | None = None,
+    limit: int = 50,
+    include_examples: bool = False,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """Stable keyset pages ordered by id; pass the returned next_after_id to continue."""
+    limit = max(1, min(limit, settings.vocabulary_browse_max_limit))
+    stmt = queries.browse_vocabulary(level is not None, category is not None, include_examples)
+
+    async def build() -> bytes:
+        params = {"after_id": after_id, "level": level, "category": category, "limit": limit}
+        rows = (await session.execute(stmt, params)).all()
+        words = [
+            VocabularyBrowseItem(
+                id=row.id,
+                word=row.word,
+                translation=row.translation,
+                level=row.level,
+                category=row.category,
+                example_sentence=row.example_sentence if include_examples else None,
+            )
+            for row in rows
+        ]
+        next_after_id = words[-1].id if len(words) == limit else None
+        return VocabularyBrowsePage(words=words, next_after_id=next_after_id).model_dump_json().encode()
+
+    try:
+        key = ("vocabulary_browse", after_id, level, category, limit, include_examples, await content_version.get())
+        return await response_cache.respond(request, key, build)
+    except Exception as e:
+        logger.error(f"Error browsing vocabulary: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/vocabulary/search", response_model=VocabularySearchResponse, tags=["vocabulary"])
+async def search_vocabulary(
+    q: str = Query(..., min_length=1, max_length=100),
+    level: str | None = None,
+    limit: int = 10,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Prefix autocomplete and typo-tolerant lookup over word and translation.
+    Case folding ignores the Turkish dotted/dotless i distinction (İ/I/ı/i).
+    Exact and prefix matches come first; fuzzy matches only when nothing starts with q.
+    """
+    limit = max(1, min(limit, settings.vocabulary_search_max_limit))
+    try:
+        results = await vocabulary_search.search(session, q, limit, level)
+        return VocabularySearchResponse(query=q, results=results)
+    except Exception as e:
+        logger.error(f"Error searching vocabulary: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 
 # --- QUIZ QUESTIONS ---
@@ -253,39 +355,29 @@ async def _generate_single_question(session: AsyncSession, word: str, translatio
     Generates a single smart question (Context > Translation > Definition)
     Returns a dict matching QuizQuestion schema structure.
     """
+    catalog = content_catalog.current
+
     # 0. Ensure translation
     if not translation:
-        q_word = await session.execute(
-            select(VocabularyWord).where(VocabularyWord.word == word)
-        )
-        db_word = q_word.scalar_one_or_none()
-        if db_word:
-            translation = db_word.translation
+        if catalog is not None:
+            translation = catalog.translation(word)
+        else:
+            q_word = await session.execute(queries.WORD_BY_TEXT, {"word": word})
+            db_word = q_word.scalar_one_or_none()
+            if db_word:
+                translation = db_word.translation
 
     # 1. Try Context (Fill-in-blank)
-    query_context = text("""
-        SELECT s.english_text, s.turkish_text
-        FROM vocabulary_words v
-        JOIN word_sentences ws ON v.id = ws.word_id
-        JOIN sentences s ON ws.sentence_id = s.id
-        WHERE v.word = :word
-        ORDER BY RANDOM()
-        LIMIT 1
-    """)
-    result = await session.execute(query_context, {"word": word})
-    row = result.first()
+    if catalog is not None:
+        row = catalog.context_sentence(word)
+    else:
+        result = await session.execute(queries.WORD_CONTEXT_SENTENCE, {"word": word})
+        row = result.first()
     
     if not row:
         # 1.5. Fallback: Regex Search
-        query_fallback = text("""
-            SELECT english_text, turkish_text
-            FROM sentences
-            WHERE english_text ~* :pattern
-            ORDER BY RANDOM()
-            LIMIT 1
-        """)
         # \y is postgres word boundary
-        result_fallback = await session.execute(query_fallback, {"pattern": f"\\y{word}\\y"})
+        result_fallback = await session.execute(queries.SENTENCE_BY_PATTERN, {"pattern": f"\\y{word}\\y"})
         row = result_fallback.first()
 
     question_text = ""
@@ -313,11 +405,13 @@ async def _generate_single_question(session: AsyncSession, word: str, translatio
             explanation = "Vocabulary review."
 
     # Distractors
-    query_dist = text("SELECT word FROM vocabulary_words WHERE word != :word ORDER BY RANDOM() LIMIT 3")
-    res_dist = await session.execute(query_dist, {"word": word})
-    dist_rows = res_dist.all()
+    if catalog is not None:
+        distractors = catalog.distractors(word, 3)
+    else:
+        res_dist = await session.execute(queries.DISTRACTOR_WORDS, {"word": word})
+        distractors = [r[0] for r in res_dist.all()]
     
-    options = [word] + [r[0] for r in dist_rows]
+    options = [word] + distractors
     while len(options) < 4:
         options.append("other")
     random.shuffle(options)
@@ -326,7 +420,7 @@ async def _generate_single_question(session: AsyncSession, word: str, translatio
         "question_text": question_text,
         "question_type": "multiple_choice",
         "correct_answer": word,
-        "options": json.dumps(options),
+        "options": options,  # Encoded by the caller (string or native list)
         "level": level,
         "category": category,
         "explanation": explanation
@@ -334,70 +428,86 @@ async def _generate_single_question(session: AsyncSession, word: str, translatio
 
 # --- QUIZ QUESTIONS ---
 
-@app.get("/api/quiz/questions", response_model=QuizQuestionList, tags=["quiz"])
+async def _select_quiz_words(session: AsyncSession, user_id: UUID, level: str, limit: int) -> list:
+    """
+    Picks the words for a quiz batch.
+    Strategy: 50% Due Reviews (SR), 50% Random New Words
+    """
+    sr_limit = limit // 2
+
+    # A. Fetch Due Reviews
+    res_sr = await session.execute(queries.DUE_REVIEW_WORDS, {"lim": sr_limit, "uid": str(user_id)})
+    sr_rows = res_sr.all()
+
+    # B. Fetch Random New Words (filling the rest)
+    # Exclude words already in review_schedules for this user
+    # Adjust limit if we didn't find enough reviews
+    needed_rnd = limit - len(sr_rows)
+    res_rnd = await session.execute(queries.NEW_WORDS_FOR_USER, {"level": level, "lim": needed_rnd, "uid": str(user_id)})
+    rnd_rows = res_rnd.all()
+
+    all_words = sr_rows + rnd_rows
+    random.shuffle(all_words) # Mix them up
+    return all_words
+
+
+def _to_question_read(question_id: int, w, q_data: dict) -> QuizQuestionRead:
+    return QuizQuestionRead(
+        id=question_id, # Temp ID
+        word_id=w.id, # Real DB ID for SR tracking
+        question_text=q_data["question_text"],
+        question_type=q_data["question_type"],
+        correct_answer=q_data["correct_answer"],
+        options=json.dumps(q_data["options"]),
+        level=q_data["level"],
+        category=q_data["category"],
+        explanation=q_data["explanation"],
+        created_at=None
+    )
+
+
+def _to_question_dict(question_id: int, w, q_data: dict) -> dict:
+    """native=true counterpart of _to_question_read: options stay a list."""
+    return {
+        "id": question_id,
+        "word_id": w.id,
+        "question_text": q_data["question_text"],
+        "question_type": q_data["question_type"],
+        "correct_answer": q_data["correct_answer"],
+        "options": q_data["options"],
+        "level": q_data["level"],
+        "category": q_data["category"],
+        "explanation": q_data["explanation"],
+        "created_at": None,
+    }
+
+
+@app.get(
+    "/api/quiz/questions",
+    response_model=QuizQuestionList,
+    responses={200: {"model": QuizQuestionNativeList, "description": "native=true: options as a JSON list"}},
+    tags=["quiz"],
+)
 async def get_quiz_questions(
     level: str = "A1",
     limit: int = 10,
+    native: bool = False,
     user_id: UUID = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session)
 ):
+    """native=true: options as a list instead of a JSON string, orjson-serialized, no response_model re-validation."""
     try:
         # 1. Smart Batch Generation
-        # Strategy: 50% Due Reviews (SR), 50% Random New Words
-        
-        sr_limit = limit // 2
-        new_limit = limit - sr_limit
-        
-        # A. Fetch Due Reviews
-        # Note: We use raw sql here to simplify joining with vocab
-        query_sr = text("""
-            SELECT v.id, v.word, v.translation, v.level, v.category
-            FROM review_schedules rs
-            JOIN vocabulary_words v ON rs.word_id = v.id
-            WHERE rs.next_review <= NOW() AND rs.user_id = :uid
-            ORDER BY rs.next_review ASC
-            LIMIT :lim
-        """)
-        res_sr = await session.execute(query_sr, {"lim": sr_limit, "uid": str(user_id)})
-        sr_rows = res_sr.all()
-        
-        # B. Fetch Random New Words (filling the rest)
-        # Exclude words already in review_schedules for this user
-        query_rnd = text("""
-            SELECT v.id, v.word, v.translation, v.level, v.category
-            FROM vocabulary_words v
-            LEFT JOIN review_schedules rs ON v.id = rs.word_id AND rs.user_id = :uid
-            WHERE v.level = :level AND rs.id IS NULL
-            ORDER BY RANDOM()
-            LIMIT :lim
-        """)
-        # Adjust limit if we didn't find enough reviews
-        needed_rnd = limit - len(sr_rows)
-        res_rnd = await session.execute(query_rnd, {"level": level, "lim": needed_rnd, "uid": str(user_id)})
-        rnd_rows = res_rnd.all()
-        
-        all_words = sr_rows + rnd_rows
-        random.shuffle(all_words) # Mix them up
+        all_words = await _select_quiz_words(session, user_id, level, limit)
         
         q_list = []
         for i, w in enumerate(all_words):
             # Generate smart question for each
             q_data = await _generate_single_question(session, w.word, w.translation, w.level, w.category)
-            
-            # Map to response schema
-            q_list.append(QuizQuestionRead(
-                id=i + 1, # Temp ID
-                word_id=w.id, # Real DB ID for SR tracking
-                question_text=q_data["question_text"],
-                question_type=q_data["question_type"],
-                correct_answer=q_data["correct_answer"],
-                options=q_data["options"],
-                level=q_data["level"],
-                category=q_data["category"],
-                explanation=q_data["explanation"],
-                created_at=None
-            ))
-            
+            q_list.append((_to_question_dict if native else _to_question_read)(i + 1, w, q_data))
+
+        if native:
+            return FastJSONResponse({"questions": q_list, "total": len(q_list)})
         return QuizQuestionList(questions=q_list, total=len(q_list))
         
     except Exception as e:
@@ -405,142 +515,80 @@ async def get_quiz_questions(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/quiz/questions/stream", tags=["quiz"])
+async def stream_quiz_questions(
+    level: str = "A1",
+    limit: int = 10,
+    user_id: UUID = Depends(get_current_user_id),
+):
+    """
+    NDJSON variant of /api/quiz/questions: one QuizQuestionRead per line,
+    emitted as soon as it is generated. Questions are built concurrently,
+    each on its own DB session (an AsyncSession can't run queries in parallel).
+    No request-scoped session: a Depends(get_session) one would stay checked
+    out until the stream ends, on top of the per-question sessions.
+    """
+    try:
+        # Short-lived session: its connection goes back to the pool before streaming starts
+        async with async_session() as session:
+            all_words = await _select_quiz_words(session, user_id, level, limit)
+    except Exception as e:
+        logger.error(f"Error selecting quiz words: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    semaphore = asyncio.Semaphore(settings.quiz_generation_concurrency)
+
+    async def build(w) -> tuple:
+        async with semaphore:
+            async with async_session() as own_session:
+                q_data = await _generate_single_question(own_session, w.word, w.translation, w.level, w.category)
+        return w, q_data
+
+    async def ndjson_lines():
+        tasks = [asyncio.ensure_future(build(w)) for w in all_words]
+        try:
+            emitted = 0
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    w, q_data = await next_done
+                except Exception as e:
+                    logger.error(f"Error generating streamed question: {e}", exc_info=True)
+                    continue
+                emitted += 1
+                yield _to_question_read(emitted, w, q_data).model_dump_json() + "\n"
+        finally:
+            # Client disconnected or generation finished: stop the stragglers
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @app.post("/api/quiz/sessions", response_model=QuizSessionRead, tags=["quiz"])
 async def create_quiz_session(
     payload: QuizSessionCreate,
-    user: User = Depends(get_or_create_user),
+    user_id: UUID = Depends(get_current_db_user_id),
     session: AsyncSession = Depends(get_session)
 ):
     try:
-        user_id = user.id
         logger.info(f"Quiz Submission Request for User ID: {user_id}")
         logger.info(f"Payload Score: {payload.score}, Questions: {payload.total_questions}")
-        
-        # 1. Save Session
-        new_session = QuizSession(
-            user_id=user_id,
-            score=payload.score,
-            total_questions=payload.total_questions,
-            correct_answers=payload.correct_answers,
-            category_breakdown=payload.category_breakdown
-        )
-        session.add(new_session)
-        
-        # 2. Process Detailed Results (Update SR)
-        if payload.results:
-            for res in payload.results:
-                if not res.word_id:
-                    continue # Skip if no ID (shouldn't happen with new logic)
-                    
-                # Get existing schedule
-                q_sch = await session.execute(
-                    select(ReviewSchedule).where(
-                        ReviewSchedule.user_id == str(user_id),
-                        ReviewSchedule.word_id == res.word_id
-                    )
-                )
-                schedule = q_sch.scalar_one_or_none()
-                
-                # Quality: 5 = Correct + Fast, 3 = Correct + Slow, 0 = Incorrect
-                # Simplified logic for now: Correct = 4, Incorrect = 1
-                quality = 4 if res.is_correct else 1
-                
-                if not schedule:
-                    # Create new schedule
-                    init_data = sr_engine.create_initial_schedule()
-                    schedule = ReviewSchedule(
-                        user_id=str(user_id),
-                        word_id=res.word_id,
-                        next_review=init_data.next_review,
-                        interval=init_data.interval,
-                        repetitions=init_data.repetitions,
-                        easiness_factor=init_data.easiness_factor,
-                        last_reviewed=init_data.last_reviewed
-                    )
-                    session.add(schedule)
-                
-                # Calculate next review
-                next_data = sr_engine.calculate_next_review(
-                    schedule.interval, schedule.repetitions, schedule.easiness_factor, quality
-                )
-                
-                schedule.next_review = next_data.next_review
-                schedule.interval = next_data.interval
-                schedule.repetitions = next_data.repetitions
-                schedule.easiness_factor = next_data.easiness_factor
-                schedule.last_reviewed = next_data.last_reviewed
-
-        # 3. Level Up Logic
-        achieved_level = None
-        # XP Calculation: Total cumulative correct answers
-        total_xp_res = await session.execute(
-            select(func.sum(QuizSession.correct_answers)).where(QuizSession.user_id == str(user_id))
-        )
-        current_xp = total_xp_res.scalar() or 0
-        
-        # Define Thresholds
-        LEVEL_THRESHOLDS = {
-            "A1": 0,
-            "A2": 50, 
-            "B1": 150,
-            "B2": 300,
-            "C1": 600,
-            "C2": 1000
-        }
-        
-        # Get Current Goal
-        goal_res = await session.execute(
-            select(LearningGoal).where(LearningGoal.user_id == str(user_id)).order_by(LearningGoal.created_at.desc()).limit(1)
-        )
-        current_goal = goal_res.scalar_one_or_none()
-        
-        if current_goal:
-            new_level = current_goal.level
-            
-            # Find highest qualified level
-            for lvl, threshold in LEVEL_THRESHOLDS.items():
-                if current_xp >= threshold:
-                    if LEVEL_THRESHOLDS.get(lvl, 0) > LEVEL_THRESHOLDS.get(current_goal.level, 0):
-                         new_level = lvl
-            
-            if new_level != current_goal.level:
-                current_goal.level = new_level
-                session.add(current_goal)
-                logger.info(f"User {user_id} leveled up to {new_level}!")
-                achieved_level = new_level
 
-        await session.commit()
-        await session.refresh(new_session)
-        
-        # Fetch the updated goal to return with progress info
-        updated_goal_res = await session.execute(
-            select(LearningGoal).where(LearningGoal.user_id == str(user_id)).order_by(LearningGoal.created_at.desc()).limit(1)
-        )
-        goal_for_response = updated_goal_res.scalar_one_or_none()
+        # Session, SR schedules, XP and level up in one transaction (fixed statement count)
+        result = await submit_quiz(session, user_id, payload)
+        mark_user_write(user_id)
+        leaderboard.record(user_id, result.xp, result.level)
+        # The quiz was taken at the pre-submission level; a level-up must not move it into the next level's distribution
+        percentile_service.record_score(result.old_level, payload.score)
 
-        # Recalculate progress for response
-        total_xp_res_resp = await session.execute(
-            select(func.sum(QuizSession.correct_answers)).where(QuizSession.user_id == str(user_id))
+        resp_dict = payload.model_dump(exclude={"results"})
+        resp_dict.update(
+            id=result.id,
+            user_id=user_id,
+            completed_at=result.completed_at,
+            created_at=result.created_at,
+            new_level=result.new_level,
         )
-        current_xp_resp = total_xp_res_resp.scalar() or 0
-        
-        next_level = None
-        next_level_xp = 0
-        LEVEL_ORDER = ["A1", "A2", "B1", "B2", "C1", "C2"]
-        current_level_idx = -1
-        if goal_for_response and goal_for_response.level in LEVEL_ORDER:
-            current_level_idx = LEVEL_ORDER.index(goal_for_response.level)
-            
-        if current_level_idx != -1 and current_level_idx < len(LEVEL_ORDER) - 1:
-            next_level = LEVEL_ORDER[current_level_idx + 1]
-            next_level_xp = LEVEL_THRESHOLDS.get(next_level, 0)
-
-        # Prepare response
-        resp_dict = new_session.__dict__.copy()
-        resp_dict["new_level"] = achieved_level
-        # Note: QuizSessionRead doesn't standardly return current_xp/next_level_xp, 
-        # but the frontend fetches /api/learning-goals/latest separately or we could add it.
-        # For now, we just ensure level up happens.
         return QuizSessionRead.model_validate(resp_dict)
     except Exception as e:
         logger.error(f"Error saving quiz session: {e}", exc_info=True)
@@ -577,7 +625,7 @@ async def generate_quiz_db(
             question_text=q_data["question_text"],
             question_type=q_data["question_type"],
             correct_answer=q_data["correct_answer"],
-            options=q_data["options"],
+            options=json.dumps(q_data["options"]),
             level=q_data["level"],
             category=q_data["category"],
             explanation=q_data["explanation"]
@@ -608,19 +656,12 @@ class DueReviewItem(BaseModel):
 @app.get("/api/ml/due-reviews/{user_id}", response_model=list[DueReviewItem], tags=["sr"])
 async def get_due_reviews(
     user_id: UUID,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     try:
-        # Cast UUID to string for consistency if needed, but SQLAlchemy handles it.
-        # Check review_schedules
-        query = select(ReviewSchedule, VocabularyWord).join(
-            VocabularyWord, ReviewSchedule.word_id == VocabularyWord.id
-        ).where(
-            ReviewSchedule.user_id == str(user_id),
-            ReviewSchedule.next_review <= datetime.now(timezone.utc)
-        ).order_by(ReviewSchedule.next_review).limit(50)
-        
-        result = await session.execute(query)
+        result = await session.execute(
+            queries.DUE_REVIEWS_WITH_WORDS, {"uid": str(user_id), "now": datetime.now(timezone.utc)}
+        )
         rows = result.all()
         
         items = []
@@ -681,6 +722,7 @@ async def create_schedule(
         )
         session.add(new_schedule)
         await session.commit()
+        mark_user_write(request.user_id)
         await session.refresh(new_schedule)
         return _map_schedule(new_schedule)
     except Exception as e:
@@ -733,6 +775,7 @@ async def update_schedule(
         current.last_reviewed = new_data.last_reviewed
         
         await session.commit()
+        mark_user_write(request.user_id)
         await session.refresh(current)
         return _map_schedule(current)
         
@@ -764,8 +807,6 @@ def _map_schedule(s: ReviewSchedule) -> ReviewScheduleResponse:
     )
 
 
-from sqlalchemy import func
-
 # --- STATISTICS ---
 
 class RecentQuizItem(BaseModel):
@@ -778,29 +819,24 @@ class StatisticsResponse(BaseModel):
     total_correct: int
     total_questions: int
     recent_quizzes: list[RecentQuizItem]
+    level: str | None = None
+    # Latest quiz score beats X% of quizzes taken at your level; None until enough data / no level yet
+    score_percentile: float | None = None
+    xp_percentile: float | None = None
 
 @app.get("/api/statistics", response_model=StatisticsResponse, tags=["statistics"])
 async def get_statistics(
-    user: User = Depends(get_or_create_user),
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    user_id: UUID = Depends(get_current_db_user_id),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    try:
-        user_id = user.id
-        logger.info(f"Statistics Request for User ID: {user_id} (Type: {type(user_id)})")
-        # Aggregates
-        query_agg = select(
-            func.count(QuizSession.id),
-            func.coalesce(func.avg(QuizSession.score), 0),
-            func.coalesce(func.sum(QuizSession.correct_answers), 0),
-            func.coalesce(func.sum(QuizSession.total_questions), 0)
-        ).where(QuizSession.user_id == str(user_id))
-        
-        # Log the compiled query for debugging
-        # logger.info(f"Stats Query: {query_agg.compile(compile_kwargs={'literal_binds': True})}")
-
-        res_agg = await session.execute(query_agg)
-        total_quizzes, avg_score, total_correct, total_questions = res_agg.one()
-        logger.info(f"Stats Result: Quizzes={total_quizzes}, Correct={total_correct}")
+    async def build() -> bytes:
+        stats, _ = await user_stats.get_stats_with_goal(session, user_id)
+        if stats is None:
+            stats = await user_stats.compute_stats_from_history(session, user_id)
+        total_quizzes = stats.quiz_count
+        avg_score = stats.score_sum / stats.quiz_count if stats.quiz_count else 0.0
+        total_correct, total_questions = stats.xp, stats.total_questions
         
         # Recent Quizzes (Last 10)
         query_recent = select(QuizSession).where(
@@ -824,31 +860,160 @@ async def get_statistics(
             average_score=float(avg_score),
             total_correct=total_correct,
             total_questions=total_questions,
-            recent_quizzes=recent_list
-        )
-        
+            recent_quizzes=recent_list,
+            level=stats.level,
+            # Latest single score vs. single scores at this level (the sketch holds per-quiz scores, not averages)
+            score_percentile=percentile_service.score_percentile(stats.level, recent_rows[0].score) if recent_rows else None,
+            xp_percentile=leaderboard.percentile(user_id),
+        ).model_dump_json().encode()
+
+    try:
+        # Recomputed only after this user's next submission (version read from user_stats, shared by all workers)
+        key = ("statistics", str(user_id), await user_stats.get_stats_version(session, user_id))
+        return await response_cache.respond(request, key, build)
     except Exception as e:
         logger.error(f"Error fetching statistics: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+class DailyStatsItem(BaseModel):
+    date: str
+    quizzes: int
+    questions: int
+    correct: int
+    reviews: int
+
+class DailyStatsResponse(BaseModel):
+    start: str
+    end: str
+    days: list[DailyStatsItem]
+    current_streak: int
+    best_streak: int  # Longest streak ending inside the window
+
+@app.get("/api/statistics/daily", response_model=DailyStatsResponse, tags=["statistics"])
+async def get_daily_statistics(
+    request: Request,
+    start: date | None = None,
+    end: date | None = None,
+    user_id: UUID = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Per-day progress (UTC days) from the user_daily_stats rollup; defaults to the last 30 days."""
+    today = datetime.now(timezone.utc).date()
+    end = end or today
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    if (end - start).days + 1 > settings.daily_stats_max_days:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {settings.daily_stats_max_days} days")
+
+    async def build() -> bytes:
+        result = await session.execute(queries.DAILY_STATS_RANGE, {"uid": user_id, "start": start, "end": end})
+        by_day = {}
+        current_streak = 0
+        for row in result.all():
+            if row.latest:
+                # Streak is alive if the user practised today or yesterday
+                current_streak = row.streak if row.day >= today - timedelta(days=1) else 0
+            else:
+                by_day[row.day] = row
+
+        days = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            row = by_day.get(day)
+            days.append(DailyStatsItem(
+                date=day.isoformat(),
+                quizzes=row.quizzes if row else 0,
+                questions=row.questions if row else 0,
+                correct=row.correct if row else 0,
+                reviews=row.reviews if row else 0,
+            ))
+        return DailyStatsResponse(
+            start=start.isoformat(),
+            end=end.isoformat(),
+            days=days,
+            current_streak=current_streak,
+            best_streak=max((row.streak for row in by_day.values()), default=0),
+        ).model_dump_json().encode()
+
+    try:
+        version = await user_stats.get_stats_version(session, user_id)
+        key = ("statistics_daily", str(user_id), start, end, today, version)
+        return await response_cache.respond(request, key, build)
+    except Exception as e:
+        logger.error(f"Error fetching daily statistics: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- LEADERBOARD ---
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: UUID
+    display_name: str | None
+    xp: int
+    level: str | None
+
+class LeaderboardResponse(BaseModel):
+    level: str | None
+    entries: list[LeaderboardEntry]
+
+class LeaderboardRankResponse(BaseModel):
+    level: str | None
+    rank: int | None  # None: user has no XP yet (or is not in this level)
+    xp: int
+    total: int | None
+
+@app.get("/api/leaderboard", response_model=LeaderboardResponse, tags=["leaderboard"])
+async def get_leaderboard(
+    level: str | None = None,
+    limit: int = 10,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Top users by XP, globally or within a level."""
+    limit = max(1, min(limit, settings.leaderboard_max_limit))
+    try:
+        entries = await leaderboard.top(session, limit, level)
+        return LeaderboardResponse(level=level, entries=entries)
+    except Exception as e:
+        logger.error(f"Error fetching leaderboard: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/leaderboard/me", response_model=LeaderboardRankResponse, tags=["leaderboard"])
+async def get_my_rank(
+    level: str | None = None,
+    user_id: UUID = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """The caller's rank (ties share a rank); O(log n) from the in-process rank trees."""
+    try:
+        result = await leaderboard.rank(session, user_id, level)
+        if result is None:
+            return LeaderboardRankResponse(level=level, rank=None, xp=0, total=None)
+        return LeaderboardRankResponse(level=level, rank=result["rank"], xp=result["xp"], total=result["total"])
+    except Exception as e:
+        logger.error(f"Error fetching leaderboard rank: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- MOCK EXAMPLE ENDPOINT ---
 class ExampleSentenceRequest(BaseModel):
     word: str
     level: str
 
 @app.post("/api/ml/generate-example")
-async def generate_example(req: ExampleSentenceRequest, session: AsyncSession = Depends(get_session)):
-    # Simple db logic
-    q = text("SELECT english_text FROM sentences JOIN word_sentences ON sentences.id = word_sentences.sentence_id JOIN vocabulary_words ON word_sentences.word_id = vocabulary_words.id WHERE vocabulary_words.word = :word LIMIT 1")
-    res = await session.execute(q, {"word": req.word})
-    row = res.first()
-    sentence = row[0] if row else f"Example for {req.word}"
+async def generate_example(req: ExampleSentenceRequest):
+    # Simple db logic, shared word->example cache (misses cached briefly too)
+    async def load_example() -> str | None:
+        read_session = await read_sessionmaker_for()
+        async with read_session() as session:
+            res = await session.execute(queries.WORD_EXAMPLE_SENTENCE, {"word": req.word})
+            row = res.first()
+            return row[0] if row else None
+
+    cached = await example_cache.get_or_load(("db_example", req.word), load_example)
+    sentence = cached or f"Example for {req.word}"
     
     return {
         "word": req.word,
         "level": req.level,
         "example_sentence": sentence
     }
-
-
-
@@ -0,0 +1,14 @@
+"""
+İçerik sürümü: kelime/cümle verisi değiştiğinde artırılır (ETag ve cache geçersizleştirme).
+"""
+from sqlalchemy import BigInteger, Column, DateTime, String, func
+
+from app.models.learning_goal import Base
+
+
+class ContentMeta(Base):
+    __tablename__ = "content_meta"
+
+    key = Column(String(32), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
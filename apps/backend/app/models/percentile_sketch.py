@@ -0,0 +1,14 @@
+"""
+Yüzdelik taslakları: seviye bazlı skor dağılımlarının serileştirilmiş KLL taslakları.
+"""
+from sqlalchemy import Column, DateTime, String, Text, func
+
+from app.models.learning_goal import Base
+
+
+class PercentileSketch(Base):
+    __tablename__ = "percentile_sketches"
+
+    name = Column(String(64), primary_key=True)  # ör. "score:B1"
+    data = Column(Text, nullable=False)  # KLLSketch.to_dict() JSON
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
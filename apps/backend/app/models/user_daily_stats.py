@@ -0,0 +1,19 @@
+"""
+Kullanıcı başına günlük özet (UTC günü); ilerleme grafikleri ve seri (streak) için.
+"""
+from sqlalchemy import Column, Date, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.learning_goal import Base
+
+
+class UserDailyStats(Base):
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    quizzes = Column(Integer, nullable=False, default=0)
+    questions = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    reviews = Column(Integer, nullable=False, default=0)  # Güncellenen tekrar planı sayısı
+    streak = Column(Integer, nullable=False, default=1)  # Bu güne kadar kesintisiz gün sayısı
@@ -0,0 +1,20 @@
+"""
+Kullanıcı başına özet istatistikler (quiz gönderiminde artımlı güncellenir).
+"""
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.learning_goal import Base
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    xp = Column(Integer, nullable=False, default=0)  # XP = toplam doğru cevap
+    quiz_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)  # Ortalama skor = score_sum / quiz_count
+    total_questions = Column(Integer, nullable=False, default=0)
+    current_goal_id = Column(Integer, ForeignKey("learning_goals.id"), nullable=True)
+    level = Column(String(4), nullable=True)  # Güncel hedefin seviyesi
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -19,6 +19,9 @@ class VocabularyWord(Base):
     level = Column(String(4), nullable=False, index=True)  # A1, A2, B1, vb.
     category = Column(String(50), nullable=True, index=True)  # verb, noun, adjective, vb.
     example_sentence = Column(Text, nullable=True)
+    # word_sentences'tan seçilen örnek cümle; example_sentence bu cümlenin metnini taşır.
+    # Importer'lar queries.REFRESH_PRIMARY_EXAMPLES ile günceller (FK: sentences.id).
+    primary_example_sentence_id = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
 
@@ -22,6 +22,15 @@ class QuizQuestionList(BaseModel):
     questions: list[QuizQuestionRead]
     total: int
 
+
+class QuizQuestionNative(QuizQuestionRead):
+    options: list[str] | None  # native=true: JSON string yerine liste
+
+
+class QuizQuestionNativeList(BaseModel):
+    questions: list[QuizQuestionNative]
+    total: int
+
 class QuizResultDetail(BaseModel):
     word_id: int | None
     word: str
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -18,3 +19,32 @@ class VocabularyWordList(BaseModel):
     words: list[VocabularyWordRead]
     total: int
 
+
+class VocabularyBrowseItem(BaseModel):
+    id: int
+    word: str
+    translation: str
+    level: str
+    category: str | None
+    example_sentence: str | None = None
+
+
+class VocabularyBrowsePage(BaseModel):
+    words: list[VocabularyBrowseItem]
+    next_after_id: int | None  # Son sayfada None
+
+
+class VocabularySearchItem(BaseModel):
+    id: int
+    word: str
+    translation: str
+    level: str
+    category: str | None
+    match: Literal["exact", "prefix", "fuzzy"]
+    field: Literal["word", "translation"]
+
+
+class VocabularySearchResponse(BaseModel):
+    query: str
+    results: list[VocabularySearchItem]
+
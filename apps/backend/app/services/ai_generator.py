@@ -1,6 +1,10 @@
 import logging
+import time
+
 from transformers import T5Tokenizer, T5ForConditionalGeneration
 
+from app.core.metrics import record_model_time
+
 logger = logging.getLogger(__name__)
 
 class AIQuestionGenerator:
@@ -57,8 +61,10 @@ class AIQuestionGenerator:
         """
         
         try:
+            started = time.perf_counter()
             input_ids = self.tokenizer(prompt, return_tensors="pt").input_ids
             outputs = self.model.generate(input_ids, max_length=100)
+            record_model_time(time.perf_counter() - started)
             question_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
             
             # Post-processing fallback
@@ -1,11 +1,20 @@
 """
 AI servisi - OpenAI/Anthropic ile içerik üretme.
 """
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Optional
+import random
+import time
+from typing import Any, Awaitable, Callable, Iterator, Optional
 
+import httpx
+
+from app.core.cache import MISSING, SingleFlight, TTLCache
 from app.core.config import settings
+from app.core.metrics import record_model_time
+from app.services.llm_router import LLMRouter
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +22,27 @@ logger = logging.getLogger(__name__)
 class AIService:
     """AI ile kelime ve quiz soruları üretir."""
     
-    def __init__(self):
-        from app.core.config import settings
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.openai_api_key: Optional[str] = settings.openai_api_key
         self.anthropic_api_key: Optional[str] = settings.anthropic_api_key
+        # Paylaşılan client'lar (bağlantı havuzu + TLS oturumu yeniden kullanılır).
+        # `transport` verilirse SDK'lar bunun üzerinden konuşur (ör. benchmarks.llm_stub)
+        self._transport = transport
+        self._openai_client = None
+        self._anthropic_client = None
+        self._openai_semaphore = asyncio.Semaphore(settings.ai_max_concurrency)
+        self._anthropic_semaphore = asyncio.Semaphore(settings.ai_max_concurrency)
+        # Prompt+model+temperature hash'i ile anahtarlanan yanıt cache'i
+        self._cache = TTLCache(settings.ai_cache_max_entries, settings.ai_cache_ttl_seconds)
+        self._singleflight = SingleFlight()
+        self.llm_calls = 0
+        # Anahtarı tanımlı sağlayıcılar arasında gecikme/hata farkında yönlendirme
+        providers = {}
+        if self.openai_api_key:
+            providers["openai"] = self._complete_with_openai
+        if self.anthropic_api_key:
+            providers["anthropic"] = self._complete_with_anthropic
+        self.router = LLMRouter(providers)
     
     async def generate_vocabulary_word(
         self,
@@ -59,14 +85,7 @@ Return a JSON object with:
 
 Only return the JSON, no other text."""
         
-        try:
-            if self.openai_api_key:
-                return await self._generate_with_openai(prompt)
-            elif self.anthropic_api_key:
-                return await self._generate_with_anthropic(prompt)
-        except Exception as e:
-            logger.error(f"Error generating vocabulary with AI: {e}", exc_info=True)
-            return None
+        return await self._generate_json(prompt)
     
     async def generate_quiz_question(
         self,
@@ -104,74 +123,446 @@ Return a JSON object with:
 
 Only return the JSON, no other text."""
         
+        return await self._generate_json(prompt)
+    
+    async def generate_vocabulary_words(
+        self,
+        level: str,
+        count: int,
+        category: Optional[str] = None,
+        target_language: str = "en",
+        native_language: str = "tr"
+    ) -> list[dict]:
+        """
+        Tek istekte birden fazla kelime kartı üretir (toplu prompt).
+        
+        Her istek en fazla `ai_batch_size` kelime ister; geçersiz elemanlar atlanır,
+        eksik kalan kısım daha önce üretilen kelimeler hariç tutularak ek çağrılarla tamamlanır.
+        
+        Returns:
+            generate_vocabulary_word ile aynı formatta kelime listesi (en fazla `count` adet)
+        """
+        def build_prompt(n: int, exclude: list[str]) -> str:
+            avoid = f"\n- Do not use any of these words: {', '.join(exclude)}" if exclude else ""
+            return f"""Generate {n} different vocabulary words for language learning:
+- Level: {level}
+- Category: {category or "any"}
+- Target language: {target_language}
+- Native language: {native_language}{avoid}
+
+Return a JSON array of {n} objects, each with:
+[{{
+  "word": "the word in {target_language}",
+  "translation": "translation in {native_language}",
+  "level": "{level}",
+  "category": "verb|noun|adjective|adverb|preposition|conjunction",
+  "example_sentence": "a simple example sentence using this word"
+}}]
+
+Only return the JSON array, no other text."""
+
+        return await self._generate_batch(
+            count,
+            build_prompt,
+            lambda raw: _validate_vocabulary_item(raw, level, category),
+            lambda item: item["word"].lower(),
+            tokens_per_item=60,
+        )
+
+    async def generate_quiz_questions(
+        self,
+        level: str,
+        count: int,
+        category: str = "grammar",
+        target_language: str = "en"
+    ) -> list[dict]:
+        """
+        Tek istekte birden fazla quiz sorusu üretir (toplu prompt).
+        
+        Returns:
+            generate_quiz_question ile aynı formatta soru listesi (en fazla `count` adet)
+        """
+        def build_prompt(n: int, exclude: list[str]) -> str:
+            avoid = f"\n- Do not use these correct answers again: {', '.join(exclude)}" if exclude else ""
+            return f"""Generate {n} different {category} quiz questions for {level} level in {target_language}:
+- Question type: multiple_choice
+- Level: {level}
+- Category: {category}{avoid}
+
+Return a JSON array of {n} objects, each with:
+[{{
+  "question_text": "a fill-in-the-blank question with _____",
+  "correct_answer": "the correct answer",
+  "options": ["option1", "option2", "option3", "option4"],
+  "explanation": "brief explanation in Turkish"
+}}]
+
+Only return the JSON array, no other text."""
+
+        return await self._generate_batch(
+            count,
+            build_prompt,
+            lambda raw: _validate_quiz_item(raw, level, category),
+            lambda item: item["question_text"].lower(),
+            tokens_per_item=90,
+            exclude_key=lambda item: item["correct_answer"],
+        )
+
+    async def _generate_batch(
+        self,
+        count: int,
+        build_prompt: Callable[[int, list[str]], str],
+        validate: Callable[[Any], Optional[dict]],
+        dedupe_key: Callable[[dict], str],
+        tokens_per_item: int,
+        exclude_key: Optional[Callable[[dict], str]] = None,
+    ) -> list[dict]:
+        """
+        Toplu üretim döngüsü: her çağrıda eksik kadar eleman ister, elemanları
+        tek tek doğrular ve tekrarları eler. Üst üste iki çağrı hiç geçerli
+        eleman döndürmezse durur.
+        """
+        if count <= 0:
+            return []
+        if not self.openai_api_key and not self.anthropic_api_key:
+            logger.warning("No AI API key configured")
+            return []
+
+        batch_size = max(1, settings.ai_batch_size)
+        items: list[dict] = []
+        seen: set[str] = set()
+        exclude: list[str] = []
+        max_calls = -(-count // batch_size) + settings.ai_batch_max_followups
+        calls = 0
+        empty_rounds = 0
+
+        while len(items) < count and calls < max_calls and empty_rounds < 2:
+            n = min(batch_size, count - len(items))
+            prompt = build_prompt(n, exclude[-settings.ai_batch_exclude_limit:])
+            calls += 1
+            try:
+                content = await self._complete_cached(prompt, max_tokens=min(4096, 200 + n * tokens_per_item))
+            except Exception as e:
+                logger.error(f"Batch generation call failed: {e}", exc_info=True)
+                empty_rounds += 1
+                continue
+
+            accepted = rejected = 0
+            for raw in _iter_json_array(content):
+                item = validate(raw)
+                if item is None:
+                    rejected += 1
+                    continue
+                key = dedupe_key(item)
+                if key in seen:
+                    continue
+                seen.add(key)
+                exclude.append((exclude_key or dedupe_key)(item))
+                items.append(item)
+                accepted += 1
+                if len(items) >= count:
+                    break
+
+            if rejected:
+                logger.info(f"Batch generation: {accepted} accepted, {rejected} rejected")
+            if accepted == 0:
+                # Parse edilemeyen / geçersiz yanıtı cache'te tutma; yoksa tekrar deneme aynı yanıtı alır
+                self._cache.pop(self._cache_key(prompt))
+                empty_rounds += 1
+            else:
+                empty_rounds = 0
+
+        if len(items) < count:
+            logger.warning(f"Batch generation returned {len(items)}/{count} items after {calls} calls")
+        return items
+
+    async def startup(self) -> None:
+        """Uzun ömürlü AI client'larını oluşturur. Uygulama açılışında çağrılır."""
+        if self.openai_api_key:
+            self._get_openai_client()
+        if self.anthropic_api_key:
+            self._get_anthropic_client()
+
+    async def shutdown(self) -> None:
+        """Client'ların bağlantı havuzlarını kapatır."""
+        for client in (self._openai_client, self._anthropic_client):
+            if client is not None:
+                try:
+                    await client.close()
+                except Exception as e:
+                    logger.warning(f"Error closing AI client: {e}")
+        self._openai_client = None
+        self._anthropic_client = None
+
+    def _get_openai_client(self):
+        if self._openai_client is None:
+            import openai
+
+            self._openai_client = openai.AsyncOpenAI(
+                api_key=self.openai_api_key,
+                base_url=settings.openai_base_url,
+                timeout=settings.ai_request_timeout,
+                max_retries=0,  # Tekrar denemeleri _call_with_retries yönetir
+                **self._http_client_kwargs(),
+            )
+        return self._openai_client
+
+    def _get_anthropic_client(self):
+        if self._anthropic_client is None:
+            import anthropic
+
+            self._anthropic_client = anthropic.AsyncAnthropic(
+                api_key=self.anthropic_api_key,
+                base_url=settings.anthropic_base_url,
+                timeout=settings.ai_request_timeout,
+                max_retries=0,
+                **self._http_client_kwargs(),
+            )
+        return self._anthropic_client
+
+    def _http_client_kwargs(self) -> dict:
+        if self._transport is None:
+            return {}
+        return {"http_client": httpx.AsyncClient(transport=self._transport, timeout=settings.ai_request_timeout)}
+
+    async def _call_with_retries(
+        self,
+        semaphore: asyncio.Semaphore,
+        call: Callable[[], Awaitable[Any]],
+        retryable: tuple[type[BaseException], ...],
+    ) -> Any:
+        """
+        Çağrıyı eşzamanlılık limiti altında çalıştırır; rate limit ve geçici
+        hatalarda üstel bekleme (jitter'lı) ile tekrar dener.
+        Bekleme semaphore dışında yapılır, böylece slot boşa tutulmaz.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    return await call()
+            except retryable as e:
+                if attempt >= settings.ai_max_retries:
+                    raise
+                delay = _retry_after_seconds(e)
+                if delay is None:
+                    delay = min(
+                        settings.ai_retry_max_delay,
+                        settings.ai_retry_base_delay * (2 ** attempt),
+                    ) * random.uniform(0.5, 1.0)
+                attempt += 1
+                logger.warning(f"AI provider busy ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        """LLM çağrı, cache ve single-flight metrikleri."""
+        return {
+            "llm_calls": self.llm_calls,
+            "cache_hits": self._cache.hits,
+            "cache_misses": self._cache.misses,
+            "coalesced_requests": self._singleflight.coalesced,
+            "inflight": len(self._singleflight),
+            "cache_size": len(self._cache),
+            "router": self.router.to_dict(),
+        }
+
+    def _cache_key(self, prompt: str) -> str:
+        # Yanıtı hangi sağlayıcının vereceği önceden bilinmez; tanımlı modellerin hepsi anahtara girer
+        models = ",".join(
+            settings.openai_model if name == "openai" else settings.anthropic_model
+            for name in self.router.providers
+        )
+        raw = f"{models}\x00{settings.ai_temperature}\x00{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _complete_cached(self, prompt: str, max_tokens: int = 500) -> str:
+        """
+        _complete'in cache'li hali. Aynı prompt için eşzamanlı çağrılar tek bir
+        LLM isteğini paylaşır (single-flight); başarılı yanıtlar TTL süresince saklanır.
+        """
+        key = self._cache_key(prompt)
+        cached = self._cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        async def load() -> str:
+            content = await self._complete(prompt, max_tokens)
+            self._cache.set(key, content)
+            return content
+
+        return await self._singleflight.do(key, load)
+
+    async def _generate_json(self, prompt: str) -> Optional[dict]:
+        """Tek JSON obje döndüren prompt'u çalıştırır ve parse eder."""
         try:
-            if self.openai_api_key:
-                return await self._generate_with_openai(prompt)
-            elif self.anthropic_api_key:
-                return await self._generate_with_anthropic(prompt)
+            content = await self._complete_cached(prompt)
+        except ImportError as e:
+            logger.error(f"AI provider library not installed ({e}). Run: pip install openai / pip install anthropic")
+            return None
         except Exception as e:
-            logger.error(f"Error generating quiz with AI: {e}", exc_info=True)
+            logger.error(f"AI API error: {e}", exc_info=True)
             return None
-    
-    async def _generate_with_openai(self, prompt: str) -> Optional[dict]:
-        """OpenAI API kullanarak içerik üretir."""
         try:
-            import openai
-            
-            client = openai.AsyncOpenAI(api_key=self.openai_api_key)
-            
-            response = await client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            return json.loads(_strip_code_fence(content))
+        except json.JSONDecodeError as e:
+            # Bozuk yanıtı cache'te tutma
+            self._cache.pop(self._cache_key(prompt))
+            logger.error(f"AI returned invalid JSON: {e}")
+            return None
+
+    async def _complete(self, prompt: str, max_tokens: int = 500) -> str:
+        """Router üzerinden (en hızlı sağlıklı sağlayıcı) ham metin yanıtı alır. Hata durumunda exception fırlatır."""
+        self.llm_calls += 1
+        started = time.perf_counter()
+        try:
+            return await self.router.complete(prompt, max_tokens)
+        finally:
+            record_model_time(time.perf_counter() - started)
+
+    async def _complete_with_openai(self, prompt: str, max_tokens: int) -> str:
+        import openai
+
+        client = self._get_openai_client()
+
+        response = await self._call_with_retries(
+            self._openai_semaphore,
+            lambda: client.chat.completions.create(
+                model=settings.openai_model,
                 messages=[
                     {"role": "system", "content": "You are a language learning content generator. Always return valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.7,
-                max_tokens=500,
-            )
-            
-            content = response.choices[0].message.content.strip()
-            # JSON'u parse et
-            if content.startswith("```json"):
-                content = content[7:-3].strip()
-            elif content.startswith("```"):
-                content = content[3:-3].strip()
-            
-            return json.loads(content)
-        except ImportError:
-            logger.error("OpenAI library not installed. Run: pip install openai")
-            return None
-        except Exception as e:
-            logger.error(f"OpenAI API error: {e}", exc_info=True)
-            return None
-    
-    async def _generate_with_anthropic(self, prompt: str) -> Optional[dict]:
-        """Anthropic API kullanarak içerik üretir."""
-        try:
-            import anthropic
-            
-            client = anthropic.AsyncAnthropic(api_key=self.anthropic_api_key)
-            
-            response = await client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=500,
+                temperature=settings.ai_temperature,
+                max_tokens=max_tokens,
+            ),
+            (openai.RateLimitError, openai.APITimeoutError, openai.InternalServerError),
+        )
+        return response.choices[0].message.content.strip()
+
+    async def _complete_with_anthropic(self, prompt: str, max_tokens: int) -> str:
+        import anthropic
+
+        client = self._get_anthropic_client()
+
+        response = await self._call_with_retries(
+            self._anthropic_semaphore,
+            lambda: client.messages.create(
+                model=settings.anthropic_model,
+                max_tokens=max_tokens,
+                temperature=settings.ai_temperature,
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
-            )
-            
-            content = response.content[0].text.strip()
-            # JSON'u parse et
-            if content.startswith("```json"):
-                content = content[7:-3].strip()
-            elif content.startswith("```"):
-                content = content[3:-3].strip()
-            
-            return json.loads(content)
-        except ImportError:
-            logger.error("Anthropic library not installed. Run: pip install anthropic")
-            return None
-        except Exception as e:
-            logger.error(f"Anthropic API error: {e}", exc_info=True)
-            return None
+            ),
+            (anthropic.RateLimitError, anthropic.APITimeoutError, anthropic.InternalServerError),
+        )
+        return response.content[0].text.strip()
+
+
+def _strip_code_fence(content: str) -> str:
+    """Model yanıtındaki ```json ... ``` sarmalayıcısını kaldırır."""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    elif content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    return content.strip()
+
+
+def _iter_json_array(content: str) -> Iterator[Any]:
+    """
+    JSON dizisini eleman eleman parse eder.
+    Bozuk bir eleman atlanır, yanıt max_tokens ile kesilmişse
+    tamamlanmış elemanlar yine de döner.
+    """
+    text = _strip_code_fence(content)
+    decoder = json.JSONDecoder()
+    pos = text.find("[")
+    if pos == -1:
+        # Model tek obje döndürmüş olabilir
+        pos = text.find("{")
+        if pos != -1:
+            try:
+                yield decoder.raw_decode(text, pos)[0]
+            except json.JSONDecodeError:
+                pass
+        return
+
+    pos += 1
+    end = len(text)
+    while pos < end:
+        while pos < end and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= end or text[pos] == "]":
+            return
+        try:
+            value, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            # Bir sonraki objeye atla
+            pos = text.find("{", pos + 1)
+            if pos == -1:
+                return
+            continue
+        yield value
+
+
+def _clean_str(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return value or None
+
+
+def _validate_vocabulary_item(raw: Any, level: str, category: Optional[str]) -> Optional[dict]:
+    if not isinstance(raw, dict):
+        return None
+    word = _clean_str(raw.get("word"))
+    translation = _clean_str(raw.get("translation"))
+    if not word or not translation or len(word) > 100 or len(translation) > 200:
+        return None
+    return {
+        "word": word,
+        "translation": translation,
+        "level": level,
+        "category": _clean_str(raw.get("category")) or category or "general",
+        "example_sentence": _clean_str(raw.get("example_sentence")),
+    }
+
+
+def _validate_quiz_item(raw: Any, level: str, category: str) -> Optional[dict]:
+    if not isinstance(raw, dict):
+        return None
+    question_text = _clean_str(raw.get("question_text"))
+    correct_answer = _clean_str(raw.get("correct_answer"))
+    options = raw.get("options")
+    if not question_text or not correct_answer or not isinstance(options, list):
+        return None
+    options = [o for o in (_clean_str(opt) for opt in options) if o]
+    if len(options) < 2 or correct_answer not in options:
+        return None
+    return {
+        "question_text": question_text,
+        "correct_answer": correct_answer,
+        "options": options,
+        "explanation": _clean_str(raw.get("explanation")) or "",
+        "level": level,
+        "category": category,
+    }
+
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Sağlayıcının Retry-After header'ını (varsa) saniye olarak döner."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return min(float(value), settings.ai_retry_max_delay) if value is not None else None
+    except ValueError:
+        return None
+
 
+ai_service = AIService()
@@ -0,0 +1,367 @@
+"""
+İçerik kataloğu: vocabulary_words, sentences ve word_sentences'ın bellekteki kopyası.
+
+Bu tabloları yalnızca import scriptleri değiştirir. Katalog tek bir ikili
+snapshot dosyasına yazılır ve mmap ile açılır; yeniden başlatmada aynı
+içerik sürümünün snapshot'ı varsa DB'ye gidilmez. Dosya düzeni:
+    "LXCC" + uint32 başlık uzunluğu + JSON başlık, ardından 8 bayta hizalı bölümler
+    strings         UTF-8, tekilleştirilmiş (interned) metinler art arda
+    string_offsets  uint64, metin i = strings[off[i]:off[i+1]]
+    words           int64 x 7: id, word, translation, level, category, example, created_at (µs)
+                    (metinler string indeksi, yoksa -1); (level, id) sıralı, seviyeler ardışık
+    word_order      uint32, kelime metnine göre sıralı satır numaraları (tam eşleşme araması)
+    sentences       uint32 x 2: english, turkish string indeksleri
+    link_offsets    uint32, kelime satırı i'nin cümleleri = links[off[i]:off[i+1]]
+    links           uint32 cümle satır numaraları
+İçerik sürümü (content_meta) değişince katalog arka planda yeniden kurulur.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.http_cache import content_version
+from app.db.session import async_session
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+SNAPSHOT_MAGIC = b"LXCC"
+SNAPSHOT_FORMAT = 1
+HEADER = struct.Struct("<4sI")
+WORD_FIELDS = 7
+NONE = -1
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+SECTIONS = [
+    ("strings", "B"),
+    ("string_offsets", "Q"),
+    ("words", "q"),
+    ("word_order", "I"),
+    ("sentences", "I"),
+    ("link_offsets", "I"),
+    ("links", "I"),
+]
+
+CATALOG_WORDS = text("""
+    SELECT id, word, translation, level, category, example_sentence, created_at
+    FROM vocabulary_words
+    ORDER BY level, id
+""")
+CATALOG_SENTENCES = text("SELECT id, english_text, turkish_text FROM sentences ORDER BY id")
+CATALOG_LINKS = text("SELECT word_id, sentence_id FROM word_sentences ORDER BY word_id, sentence_id")
+
+
+class CatalogWord(NamedTuple):
+    id: int
+    word: str
+    translation: str
+    level: str
+    category: Optional[str]
+    example_sentence: Optional[str]
+    created_at: Optional[datetime]
+
+
+def _micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return NONE
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def build_snapshot(path: Path, version: str, words: list, sentences: list, links: list) -> None:
+    """
+    DB satırlarından snapshot dosyasını yazar (geçici dosya + os.replace;
+    dosyayı mmap ile açmış diğer worker'lar eski kopyayı okumaya devam eder).
+    """
+    pool: dict[str, int] = {}
+    strings = bytearray()
+    string_offsets = array("Q", [0])
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        idx = pool.get(value)
+        if idx is None:
+            idx = pool[value] = len(pool)
+            strings.extend(value.encode("utf-8"))
+            string_offsets.append(len(strings))
+        return idx
+
+    word_cols = array("q")
+    levels: dict[str, list[int]] = {}
+    word_rows: dict[int, int] = {}
+    for row_no, (word_id, word, translation, level, category, example, created_at) in enumerate(words):
+        word_cols.extend((word_id, intern(word), intern(translation), intern(level),
+                          intern(category), intern(example), _micros(created_at)))
+        levels.setdefault(level, [row_no, 0])[1] += 1
+        word_rows[word_id] = row_no
+    word_order = array("I", sorted(range(len(words)), key=lambda row_no: words[row_no][1]))
+
+    sentence_cols = array("I")
+    sentence_rows: dict[int, int] = {}
+    for row_no, (sentence_id, english, turkish) in enumerate(sentences):
+        sentence_cols.extend((intern(english), intern(turkish)))
+        sentence_rows[sentence_id] = row_no
+
+    per_word: list[list[int]] = [[] for _ in words]
+    for word_id, sentence_id in links:
+        row_no, sentence_row = word_rows.get(word_id), sentence_rows.get(sentence_id)
+        if row_no is not None and sentence_row is not None:
+            per_word[row_no].append(sentence_row)
+    link_offsets = array("I", [0])
+    link_targets = array("I")
+    for targets in per_word:
+        link_targets.extend(targets)
+        link_offsets.append(len(link_targets))
+
+    payloads = {
+        "strings": bytes(strings),
+        "string_offsets": string_offsets.tobytes(),
+        "words": word_cols.tobytes(),
+        "word_order": word_order.tobytes(),
+        "sentences": sentence_cols.tobytes(),
+        "link_offsets": link_offsets.tobytes(),
+        "links": link_targets.tobytes(),
+    }
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "byteorder": sys.byteorder,
+        "content_version": version,
+        "levels": levels,
+        "sections": {},
+    }
+    # Bölüm konumları başlığın boyutuna bağlı: başlık için yer ayırıp sabitlenene kadar tekrar hesapla
+    data_start = 0
+    while True:
+        position = data_start
+        for name, _ in SECTIONS:
+            header["sections"][name] = [position, len(payloads[name])]
+            position += -(-len(payloads[name]) // 8) * 8
+        encoded = json.dumps(header).encode("utf-8")
+        needed = -(-(HEADER.size + len(encoded)) // 8) * 8
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=".catalog-", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(SNAPSHOT_MAGIC, len(encoded)))
+            f.write(encoded)
+            for name, _ in SECTIONS:
+                offset, _ = header["sections"][name]
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(payloads[name])
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    logger.info(f"Built content catalog v{version}: {len(words)} words, {len(sentences)} sentences, "
+                f"{len(link_targets)} links, {len(pool)} strings -> {path}")
+
+
+class ContentCatalog:
+    """mmap ile açılmış salt okunur katalog. Eski kopyalar referans kalmayınca kapanır."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a content catalog snapshot")
+        header = json.loads(self._mm[HEADER.size:HEADER.size + header_len])
+        self.format = header["format"]
+        self.byteorder = header["byteorder"]
+        self.version: str = header["content_version"]
+        self.levels: dict[str, tuple[int, int]] = {level: tuple(span) for level, span in header["levels"].items()}
+        view = memoryview(self._mm)
+        for name, typecode in SECTIONS:
+            offset, length = header["sections"][name]
+            setattr(self, f"_{name}", view[offset:offset + length].cast(typecode))
+
+    def __len__(self) -> int:
+        return len(self._words) // WORD_FIELDS
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self._sentences) // 2
+
+    def string(self, idx: int) -> Optional[str]:
+        if idx == NONE:
+            return None
+        return bytes(self._strings[self._string_offsets[idx]:self._string_offsets[idx + 1]]).decode("utf-8")
+
+    def _word_text(self, row_no: int) -> str:
+        return self.string(self._words[row_no * WORD_FIELDS + 1])
+
+    def word(self, row_no: int) -> CatalogWord:
+        base = row_no * WORD_FIELDS
+        word_id, word, translation, level, category, example, created_at = self._words[base:base + WORD_FIELDS]
+        return CatalogWord(
+            id=word_id,
+            word=self.string(word),
+            translation=self.string(translation),
+            level=self.string(level),
+            category=self.string(category),
+            example_sentence=self.string(example),
+            created_at=None if created_at == NONE else EPOCH + timedelta(microseconds=created_at),
+        )
+
+    def text_fields(self, row_no: int) -> tuple[str, str, str]:
+        """(word, translation, level); arama indeksi kurulumu için word()'den hafif."""
+        base = row_no * WORD_FIELDS
+        return self.string(self._words[base + 1]), self.string(self._words[base + 2]), self.string(self._words[base + 3])
+
+    def find_rows(self, word: str) -> list[int]:
+        """Metni tam olarak `word` olan kelime satırları (word_order üzerinde ikili arama)."""
+        order = self._word_order
+        pos = bisect_left(order, word, key=self._word_text)
+        rows = []
+        while pos < len(order) and self._word_text(order[pos]) == word:
+            rows.append(order[pos])
+            pos += 1
+        return rows
+
+    def translation(self, word: str) -> Optional[str]:
+        rows = self.find_rows(word)
+        return self.string(self._words[rows[0] * WORD_FIELDS + 2]) if rows else None
+
+    def random_words(self, level: str, limit: int) -> list[CatalogWord]:
+        start, count = self.levels.get(level, (0, 0))
+        return [self.word(row_no) for row_no in random.sample(range(start, start + count), min(limit, count))]
+
+    def context_sentence(self, word: str) -> Optional[tuple[str, str]]:
+        """Kelimeye bağlı cümlelerden rastgele biri (english, turkish)."""
+        spans = [(self._link_offsets[r], self._link_offsets[r + 1]) for r in self.find_rows(word)]
+        total = sum(end - start for start, end in spans)
+        if not total:
+            return None
+        pick = random.randrange(total)
+        for start, end in spans:
+            if pick < end - start:
+                sentence_row = self._links[start + pick]
+                break
+            pick -= end - start
+        english, turkish = self._sentences[sentence_row * 2:sentence_row * 2 + 2]
+        return self.string(english), self.string(turkish)
+
+    def distractors(self, word: str, count: int = 3) -> list[str]:
+        """`word` dışındaki rastgele kelimeler (tekrarsız, en fazla `count`)."""
+        size = len(self)
+        picked: list[str] = []
+        for _ in range(count * 10):
+            if len(picked) >= count or not size:
+                break
+            candidate = self._word_text(random.randrange(size))
+            if candidate != word and candidate not in picked:
+                picked.append(candidate)
+        return picked
+
+
+def open_snapshot(path: Path, version: str) -> Optional[ContentCatalog]:
+    """Snapshot bu içerik sürümüne aitse açar; yoksa/eskiyse None."""
+    if not path.exists():
+        return None
+    try:
+        catalog = ContentCatalog(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable content catalog snapshot {path}: {e}")
+        return None
+    if catalog.format != SNAPSHOT_FORMAT or catalog.byteorder != sys.byteorder or catalog.version != version:
+        return None
+    return catalog
+
+
+class ContentCatalogService:
+    """
+    Geçerli kataloğu tutar. `current` None ise (kapalı, yüklenemedi) çağıranlar
+    SQL sorgularına döner. Yeniden kurulum sırasında eski katalog hizmet vermeye devam eder.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.current: Optional[ContentCatalog] = None
+        self.reloads = 0
+        self.load_seconds = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def startup(self) -> None:
+        if not settings.content_catalog_enabled:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Content catalog load failed, serving content from SQL: {e}")
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.content_version_check_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Content catalog reload failed, keeping v{self.version}: {e}")
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.current.version if self.current is not None else None
+
+    async def refresh(self) -> None:
+        """İçerik sürümü değiştiyse snapshot'ı açar, yoksa DB'den kurar."""
+        version = await content_version.get()
+        if self.version == version:
+            return
+        async with self._lock:
+            if self.version == version:
+                return
+            started = time.perf_counter()
+            catalog = await asyncio.to_thread(open_snapshot, self.path, version)
+            if catalog is None:
+                # Sürüm veriden önce okunur: arada bir import olursa bir sonraki kontrol yine yeniler
+                async with async_session() as session:
+                    words = (await session.execute(CATALOG_WORDS)).all()
+                    sentences = (await session.execute(CATALOG_SENTENCES)).all()
+                    links = (await session.execute(CATALOG_LINKS)).all()
+                await asyncio.to_thread(build_snapshot, self.path, version, words, sentences, links)
+                catalog = await asyncio.to_thread(ContentCatalog, self.path)
+            self.current = catalog
+            self.load_seconds = time.perf_counter() - started
+            self.reloads += 1
+            logger.info(f"Content catalog v{version} ready: {len(catalog)} words in {self.load_seconds:.3f}s")
+
+    def stats(self) -> dict:
+        catalog = self.current
+        return {
+            "loaded": catalog is not None,
+            "words": len(catalog) if catalog is not None else 0,
+            "sentences": catalog.sentence_count if catalog is not None else 0,
+            "reloads": self.reloads,
+            "load_seconds": round(self.load_seconds, 4),
+        }
+
+
+content_catalog = ContentCatalogService(Path(settings.content_catalog_path or DATA_DIR / "content_catalog.bin"))
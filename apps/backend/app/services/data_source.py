@@ -2,18 +2,139 @@
 Dil veri setlerinden içerik çekme servisi.
 Tatoeba, OpenSubtitles, vb. kaynaklardan veri alır.
 """
+import asyncio
 import logging
-from typing import Optional
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlsplit
 
 import httpx
 
+from app.core.cache import LoadingCache
+from app.core.config import settings
+from app.services.local_corpus import LocalCorpusDataSource
+
 logger = logging.getLogger(__name__)
 
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+# Kelime -> örnek cümle cache'i; DataSourceService ve /api/ml/generate-example paylaşır
+example_cache = LoadingCache(
+    maxsize=settings.example_cache_max_entries,
+    ttl=settings.example_cache_ttl_seconds,
+    negative_ttl=settings.example_cache_negative_ttl_seconds,
+)
+
+
+class DataSourceError(Exception):
+    """Harici veri kaynağı isteği başarısız oldu (ağ hatası, beklenmeyen yanıt, vb.)."""
+
+
+class PooledHttpClient:
+    """
+    Tüm veri kaynaklarının paylaştığı HTTP client.
+    Keep-alive havuzu, HTTP/2, host başına eşzamanlılık limiti,
+    timeout ve jitter'lı tekrar deneme içerir.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            kwargs = dict(
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections,
+                    keepalive_expiry=settings.http_keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(settings.http_read_timeout, connect=settings.http_connect_timeout),
+                transport=self._transport,
+            )
+            try:
+                self._client = httpx.AsyncClient(http2=settings.http_http2, **kwargs)
+            except ImportError:
+                # HTTP/2 için 'h2' paketi gerekli (pip install httpx[http2])
+                logger.warning("h2 not installed, falling back to HTTP/1.1")
+                self._client = httpx.AsyncClient(**kwargs)
+        return self._client
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._host_semaphores.get(host)
+        if sem is None:
+            sem = self._host_semaphores[host] = asyncio.Semaphore(settings.http_per_host_concurrency)
+        return sem
+
+    async def get(self, url: str, params: Optional[dict] = None) -> httpx.Response:
+        """GET isteği; ağ hatası ve 429/5xx yanıtlarında jitter'lı üstel bekleme ile tekrar dener."""
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore(url):
+                    response = await self.client.get(url, params=params)
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response
+                error: Exception = DataSourceError(f"HTTP {response.status_code} from {url}")
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt >= settings.http_max_retries:
+                raise DataSourceError(f"GET {url} failed after {attempt + 1} attempts: {error}") from error
+            # Full jitter: [0, base * 2^attempt]
+            delay = random.uniform(0, settings.http_retry_base_delay * (2 ** attempt))
+            attempt += 1
+            logger.debug(f"Retrying {url} in {delay:.2f}s ({error})")
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def tatoeba_fixture_transport(path: Path | str = DATA_DIR / "tur.txt") -> httpx.MockTransport:
+    """
+    Ağ olmadan çalışan Tatoeba yerine geçen transport.
+    data/tur.txt (EN\tTR satırları) üzerinden /sentences/search isteklerini yanıtlar;
+    testler ve benchmark'lar için kullanılır.
+    """
+    pairs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 2:
+                pairs.append((parts[0].strip(), parts[1].strip()))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/sentences/search"):
+            return httpx.Response(404, json={"error": "not found"})
+        query = request.url.params.get("query", "").lower()
+        limit = int(request.url.params.get("limit", 5))
+        results = [
+            {"text": en, "translations": [{"text": tr}], "audio": None}
+            for en, tr in pairs
+            if query and query in en.lower().split()
+        ][:limit]
+        return httpx.Response(200, json={"results": results})
+
+    return httpx.MockTransport(handler)
+
 
 class TatoebaDataSource:
     """Tatoeba API'den çeviri cümleler çeker."""
     
-    BASE_URL = "https://tatoeba.org/api/v0"
+    def __init__(self, http: PooledHttpClient, base_url: Optional[str] = None):
+        self.http = http
+        self.base_url = (base_url or settings.tatoeba_base_url).rstrip("/")
     
     async def get_sentences(
         self,
@@ -33,39 +154,43 @@ class TatoebaDataSource:
             
         Returns:
             [{"original": "...", "translation": "...", "audio_url": "..."}]
+            
+        Raises:
+            DataSourceError: İstek tekrar denemelere rağmen başarısız olursa
         """
+        # Tatoeba API'den cümle ara
+        response = await self.http.get(
+            f"{self.base_url}/sentences/search",
+            params={
+                "query": word,
+                "from": from_lang,
+                "to": to_lang,
+                "limit": limit,
+            }
+        )
+        
+        if response.status_code != 200:
+            raise DataSourceError(f"Tatoeba API error: {response.status_code}")
+        
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # Tatoeba API'den cümle ara
-                response = await client.get(
-                    f"{self.BASE_URL}/sentences/search",
-                    params={
-                        "query": word,
-                        "from": from_lang,
-                        "to": to_lang,
-                        "limit": limit,
-                    }
-                )
-                
-                if response.status_code != 200:
-                    logger.warning(f"Tatoeba API error: {response.status_code}")
-                    return []
-                
-                data = response.json()
-                sentences = []
-                
-                # Tatoeba response formatını parse et
-                for item in data.get("results", [])[:limit]:
-                    sentences.append({
-                        "original": item.get("text", ""),
-                        "translation": item.get("translations", [{}])[0].get("text", ""),
-                        "audio_url": item.get("audio", {}).get("url") if item.get("audio") else None,
-                    })
-                
-                return sentences
-        except Exception as e:
-            logger.error(f"Error fetching from Tatoeba: {e}", exc_info=True)
-            return []
+            data = response.json()
+            sentences = []
+            
+            # Tatoeba response formatını parse et
+            for item in data.get("results", [])[:limit]:
+                translations = item.get("translations") or [{}]
+                first = translations[0]
+                if isinstance(first, list):  # API bazen iç içe liste döndürür
+                    first = first[0] if first else {}
+                sentences.append({
+                    "original": item.get("text", ""),
+                    "translation": first.get("text", ""),
+                    "audio_url": item.get("audio", {}).get("url") if item.get("audio") else None,
+                })
+        except (ValueError, AttributeError, TypeError) as e:
+            raise DataSourceError(f"Unexpected Tatoeba response: {e}") from e
+        
+        return sentences
 
 
 class OpenSubtitlesDataSource:
@@ -92,16 +217,126 @@ class OpenSubtitlesDataSource:
         """
         # OpenSubtitles API için authentication gerekli
         # Şimdilik placeholder - gerçek implementasyon için API key gerekli
-        logger.info(f"OpenSubtitles search for: {word} (not implemented yet)")
+        logger.debug(f"OpenSubtitles search for: {word} (not implemented yet)")
         return []
 
 
+FetchFn = Callable[[str, str, str, int], Awaitable[list[dict]]]
+
+
+@dataclass
+class RegisteredSource:
+    name: str
+    fetch: FetchFn
+    deadline: float
+
+
+class SourceStats:
+    """Bir kaynağın çağrı sayısı, gecikmesi ve başarısızlık sayaçları."""
+
+    def __init__(self):
+        self.calls = 0
+        self.results = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def observe(self, latency: float, result_count: int) -> None:
+        self.completed += 1
+        self.results += result_count
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "results": self.results,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "latency_avg": round(self.latency_total / self.completed, 4) if self.completed else None,
+            "latency_max": round(self.latency_max, 4),
+        }
+
+
 class DataSourceService:
-    """Tüm veri kaynaklarını yöneten ana servis."""
+    """Tüm veri kaynaklarını yöneten ana servis. Paylaşılan HTTP client'ın sahibidir."""
     
-    def __init__(self):
-        self.tatoeba = TatoebaDataSource()
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        if transport is None and settings.tatoeba_offline:
+            transport = tatoeba_fixture_transport()
+        self.http = PooledHttpClient(transport)
+        if settings.example_source == "local":
+            # Aynı arayüz, ağ yerine yerel indekslenmiş korpus
+            self.tatoeba = LocalCorpusDataSource(
+                Path(settings.corpus_path or DATA_DIR / "tur.txt"),
+                Path(settings.corpus_index_dir or DATA_DIR / "index"),
+            )
+        else:
+            self.tatoeba = TatoebaDataSource(self.http)
         self.opensubtitles = OpenSubtitlesDataSource()
+        
+        self.sources: list[RegisteredSource] = []
+        self.source_stats: dict[str, SourceStats] = {}
+        self.register_source("tatoeba", self.tatoeba.get_sentences)
+        self.register_source("opensubtitles", self._fetch_opensubtitles)
+    
+    async def startup(self) -> None:
+        """Yerel korpus kullanılıyorsa indeksi açılışta hazırlar (ilk istekte beklememek için)."""
+        if isinstance(self.tatoeba, LocalCorpusDataSource):
+            await self.tatoeba.load()
+    
+    async def aclose(self) -> None:
+        """Bağlantı havuzunu kapatır. Uygulama kapanışında çağrılır."""
+        await self.http.aclose()
+        if isinstance(self.tatoeba, LocalCorpusDataSource):
+            self.tatoeba.close()
+    
+    def register_source(self, name: str, fetch: FetchFn, deadline: Optional[float] = None) -> None:
+        """
+        Örnek cümle kaynağı ekler. `fetch(word, from_lang, to_lang, limit)`
+        [{"original", "translation", ...}] döner; `deadline` saniyesinde yanıt vermezse atlanır.
+        """
+        if deadline is None:
+            deadline = settings.data_source_deadlines.get(name, settings.data_source_default_deadline)
+        self.sources.append(RegisteredSource(name, fetch, deadline))
+        self.source_stats[name] = SourceStats()
+    
+    async def _fetch_opensubtitles(self, word: str, from_lang: str, to_lang: str, limit: int) -> list[dict]:
+        results = await self.opensubtitles.get_examples(word, from_lang[:2], limit)
+        return [
+            {"original": r.get("sentence", ""), "translation": "", "context": r.get("context"), "audio_url": None}
+            for r in results
+        ]
+    
+    async def _query_source(
+        self, source: "RegisteredSource", word: str, from_lang: str, to_lang: str, limit: int
+    ) -> Optional[list[dict]]:
+        """
+        Tek kaynağı kendi süre limitiyle sorgular. Hata/timeout durumunda None
+        döner; boş liste ise kaynağın gerçekten sonuç bulamadığı anlamına gelir.
+        """
+        stats = self.source_stats[source.name]
+        stats.calls += 1
+        started = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(source.fetch(word, from_lang, to_lang, limit), timeout=source.deadline)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            logger.warning(f"Data source {source.name} timed out after {source.deadline}s for '{word}'")
+            return None
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"Data source {source.name} failed for '{word}': {e}")
+            return None
+        stats.observe(time.perf_counter() - started, len(results))
+        return [{"source": source.name, **r} for r in results]
     
     async def get_word_examples(
         self,
@@ -113,21 +348,63 @@ class DataSourceService:
         """
         Bir kelime için tüm kaynaklardan örnekler getirir.
         
+        Kaynaklar eşzamanlı sorgulanır, her biri kendi süre limitiyle. `limit`
+        kadar (tekrarsız) örnek toplanınca kalan kaynaklar iptal edilir; böylece
+        yavaş bir kaynak yanıt süresini belirleyemez.
+        
+        Sonuçlar (boş sonuçlar dahil, daha kısa süreyle) example_cache'te tutulur.
+        Bir kaynak hata verdiği / zaman aşımına uğradığı için boş kalan sonuç
+        cache'lenmez; kısa bir kesinti dakikalarca "örnek yok" olarak kalmaz.
+        
         Returns:
             [{"source": "tatoeba", "original": "...", "translation": "...", ...}]
         """
-        examples = []
-        
-        # Tatoeba'dan çek
-        tatoeba_results = await self.tatoeba.get_sentences(word, from_lang, to_lang, limit)
-        for result in tatoeba_results:
-            examples.append({
-                "source": "tatoeba",
-                **result
-            })
-        
-        # OpenSubtitles'tan çek (gelecekte)
-        # opensubtitles_results = await self.opensubtitles.get_examples(word, from_lang, limit)
+        key = ("examples", word.strip().lower(), from_lang, to_lang, limit)
+        try:
+            return await example_cache.get_or_load(
+                key, lambda: self._collect_examples(word, from_lang, to_lang, limit)
+            )
+        except DataSourceError as e:
+            logger.warning(f"No examples for '{word}', not caching: {e}")
+            return []
+    
+    async def _collect_examples(self, word: str, from_lang: str, to_lang: str, limit: int) -> list[dict]:
+        """
+        Kaynakları eşzamanlı sorgular. Hiç örnek yoksa ve en az bir kaynak
+        başarısız olduysa DataSourceError fırlatır (sonuç cache'lenmesin diye).
+        """
+        examples: list[dict] = []
+        seen: set[str] = set()
+        failed = 0
+        tasks = [
+            asyncio.ensure_future(self._query_source(source, word, from_lang, to_lang, limit))
+            for source in self.sources
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                results = await next_done
+                if results is None:
+                    failed += 1
+                    continue
+                for example in results:
+                    key = " ".join(example.get("original", "").lower().split())
+                    if not key or key in seen:
+                        continue
+                    seen.add(key)
+                    examples.append(example)
+                if len(examples) >= limit:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
         
+        if not examples and failed:
+            raise DataSourceError(f"{failed}/{len(tasks)} example sources failed")
         return examples[:limit]
+    
+    def stats(self) -> dict:
+        """Kaynak başına gecikme / timeout / hata metrikleri."""
+        return {name: s.to_dict() for name, s in self.source_stats.items()}
+
 
+data_source_service = DataSourceService()
@@ -0,0 +1,234 @@
+"""
+XP liderlik tablosu: genel ve seviye bazlı sıralama.
+
+Kaynak user_stats.xp kolonudur (indeksli). Süreç içinde XP değerleri
+üzerinde Fenwick ağaçları tutulur; "sıram" O(log X) ile hesaplanır. İlk N
+listesi doğrudan indeksli sorgudan gelir. Bu worker'daki gönderimler ağaca
+anında işlenir; diğer worker'ların güncellemeleri periyodik yeniden
+kurulumla (`leaderboard_rebuild_interval`) gelir.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import async_session
+
+logger = logging.getLogger(__name__)
+
+ALL_USER_XP = text("SELECT user_id, xp, level FROM user_stats")
+USER_XP = text("SELECT xp, level FROM user_stats WHERE user_id = :uid")
+USERS_ABOVE_XP = text("SELECT count(*) FROM user_stats WHERE xp > :xp")
+USERS_ABOVE_XP_IN_LEVEL = text("SELECT count(*) FROM user_stats WHERE level = :level AND xp > :xp")
+
+# İlk N: (xp DESC, user_id) ve (level, xp DESC, user_id) indeksleri üzerinden
+TOP_USERS = text("""
+    SELECT s.user_id, s.xp, s.level, u.full_name
+    FROM user_stats s JOIN users u ON u.id = s.user_id
+    ORDER BY s.xp DESC, s.user_id
+    LIMIT :limit
+""")
+TOP_USERS_IN_LEVEL = text("""
+    SELECT s.user_id, s.xp, s.level, u.full_name
+    FROM user_stats s JOIN users u ON u.id = s.user_id
+    WHERE s.level = :level
+    ORDER BY s.xp DESC, s.user_id
+    LIMIT :limit
+""")
+
+
+class XPRankIndex:
+    """
+    XP değerlerinin sayımları üzerinde Fenwick (binary indexed) ağacı.
+    Boyut 2'nin kuvvetidir; büyütme mevcut düğümleri yeniden hesaplamadan yapılır.
+    """
+
+    def __init__(self, xp_values: list[int] = ()):
+        size = 1
+        top = max(xp_values, default=0) + 1
+        while size < top:
+            size *= 2
+        counts = [0] * (size + 1)
+        for xp in xp_values:
+            counts[xp + 1] += 1
+        # O(n) kurulum: her düğüm kendi toplamını ebeveynine ekler
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                counts[parent] += counts[i]
+        self.tree = counts
+        self.size = size
+        self.total = len(xp_values)
+
+    def _grow(self, xp: int) -> None:
+        while xp + 1 > self.size:
+            # (n, 2n) aralığındaki düğümler boştur; 2n düğümü her şeyi kapsar
+            self.tree.extend([0] * (self.size - 1) + [self.total])
+            self.size *= 2
+
+    def add(self, xp: int, delta: int) -> None:
+        self._grow(xp)
+        self.total += delta
+        i = xp + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def count_at_most(self, xp: int) -> int:
+        i = min(xp + 1, self.size)
+        result = 0
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def rank(self, xp: int) -> int:
+        """1 + bu XP'den fazlasına sahip kullanıcı sayısı (eşitler aynı sırayı paylaşır)."""
+        return 1 + self.total - self.count_at_most(xp)
+
+
+class Leaderboard:
+    def __init__(self):
+        self.users: dict[str, tuple[int, Optional[str]]] = {}
+        self.global_index = XPRankIndex()
+        self.by_level: dict[str, XPRankIndex] = {}
+        self.loaded = False
+        self.rebuilt_at = 0.0
+        self.rebuilds = 0
+        self._pending: Optional[list] = None  # Yeniden kurulum sırasında gelen güncellemeler
+        self._task: Optional[asyncio.Task] = None
+
+    async def startup(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Leaderboard rebuild failed, falling back to SQL ranks: {e}")
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.leaderboard_rebuild_interval)
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.warning(f"Leaderboard rebuild failed: {e}")
+
+    async def rebuild(self) -> None:
+        """user_stats'tan ağaçları yeniden kurar; bu sırada gelen güncellemeler sonra tekrar uygulanır."""
+        started = time.perf_counter()
+        self._pending = []
+        try:
+            async with async_session() as session:
+                rows = (await session.execute(ALL_USER_XP)).all()
+            users = {str(row.user_id): (row.xp, row.level) for row in rows}
+            levels: dict[str, list[int]] = {}
+            for xp, level in users.values():
+                if level:
+                    levels.setdefault(level, []).append(xp)
+
+            self.users = users
+            self.global_index = XPRankIndex([xp for xp, _ in users.values()])
+            self.by_level = {level: XPRankIndex(values) for level, values in levels.items()}
+            pending, self._pending = self._pending, None
+            for user_id, xp, level in pending:
+                self.record(user_id, xp, level)
+        finally:
+            self._pending = None
+        self.loaded = True
+        self.rebuilt_at = time.time()
+        self.rebuilds += 1
+        logger.info(f"Leaderboard rebuilt: {len(self.users)} users in {time.perf_counter() - started:.3f}s")
+
+    def record(self, user_id: UUID | str, xp: int, level: Optional[str]) -> None:
+        """Kullanıcının güncel XP/seviyesini uygular (eski değer ağaçlardan çıkarılır)."""
+        key = str(user_id)
+        if self._pending is not None:
+            self._pending.append((key, xp, level))
+        old = self.users.get(key)
+        if old == (xp, level):
+            return
+        if old is not None:
+            old_xp, old_level = old
+            self.global_index.add(old_xp, -1)
+            if old_level:
+                self.by_level[old_level].add(old_xp, -1)
+        self.users[key] = (xp, level)
+        self.global_index.add(xp, 1)
+        if level:
+            self.by_level.setdefault(level, XPRankIndex()).add(xp, 1)
+
+    def set_level(self, user_id: UUID | str, level: str) -> None:
+        xp, _ = self.users.get(str(user_id), (0, None))
+        self.record(user_id, xp, level)
+
+    async def top(self, session, limit: int, level: Optional[str] = None) -> list[dict]:
+        """İlk `limit` kullanıcı; eşit XP aynı sırayı paylaşır."""
+        if level is None:
+            rows = (await session.execute(TOP_USERS, {"limit": limit})).all()
+        else:
+            rows = (await session.execute(TOP_USERS_IN_LEVEL, {"limit": limit, "level": level})).all()
+        entries = []
+        for i, row in enumerate(rows):
+            rank = entries[-1]["rank"] if entries and entries[-1]["xp"] == row.xp else i + 1
+            entries.append({
+                "rank": rank,
+                "user_id": row.user_id,
+                "display_name": row.full_name,
+                "xp": row.xp,
+                "level": row.level,
+            })
+        return entries
+
+    async def rank(self, session, user_id: UUID | str, level: Optional[str] = None) -> Optional[dict]:
+        """Kullanıcının sırası; ağaç yüklenmemişse indeksli COUNT sorgularına düşer."""
+        if self.loaded:
+            entry = self.users.get(str(user_id))
+        else:
+            row = (await session.execute(USER_XP, {"uid": user_id})).first()
+            entry = (row.xp, row.level) if row else None
+        if entry is None:
+            return None
+        xp, user_level = entry
+        if level is not None and user_level != level:
+            return None
+        if self.loaded:
+            index = self.global_index if level is None else self.by_level.get(level, XPRankIndex())
+            return {"rank": index.rank(xp), "xp": xp, "level": user_level, "total": index.total}
+        if level is None:
+            above = (await session.execute(USERS_ABOVE_XP, {"xp": xp})).scalar()
+        else:
+            above = (await session.execute(USERS_ABOVE_XP_IN_LEVEL, {"xp": xp, "level": level})).scalar()
+        return {"rank": above + 1, "xp": xp, "level": user_level, "total": None}
+
+    def percentile(self, user_id: UUID | str) -> Optional[float]:
+        """Kullanıcının seviyesinde XP'si kendisinden düşük olanların yüzdesi (ağaç yüklüyse)."""
+        entry = self.users.get(str(user_id))
+        if not self.loaded or entry is None or not entry[1]:
+            return None
+        xp, level = entry
+        index = self.by_level[level]
+        others = index.total - 1
+        if others <= 0:
+            return None
+        return round(index.count_at_most(xp - 1) * 100 / others, 1)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "users": len(self.users),
+            "levels": {level: index.total for level, index in sorted(self.by_level.items())},
+            "rebuilds": self.rebuilds,
+            "rebuilt_at": self.rebuilt_at,
+        }
+
+
+leaderboard = Leaderboard()
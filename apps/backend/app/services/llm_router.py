@@ -0,0 +1,172 @@
+"""
+LLM sağlayıcıları arasında gecikme farkında yönlendirme ve hedged istekler.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CompleteFn = Callable[[str, int], Awaitable[str]]
+HEDGE_LOST = "hedge lost"  # Kaybeden isteğin iptal mesajı; çağıranın iptalinden ayırmak için
+
+
+class ProviderStats:
+    """Bir sağlayıcının gecikme EWMA'sı, hata oranı ve son gecikme örnekleri."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0  # Başarısızlıkların EWMA'sı (0..1)
+        self.samples: deque[float] = deque(maxlen=settings.ai_router_latency_window)
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+        self.open_until = 0.0  # Bu zamana kadar sağlıksız kabul edilir
+
+    def record_success(self, latency: float) -> None:
+        alpha = settings.ai_router_ewma_alpha
+        self.requests += 1
+        self.samples.append(latency)
+        self.latency_ewma = latency if self.latency_ewma is None else alpha * latency + (1 - alpha) * self.latency_ewma
+        self.error_rate = (1 - alpha) * self.error_rate
+
+    def record_cancelled(self, elapsed: float) -> None:
+        """Hedge'i kaybeden istek: gerçek gecikme en az `elapsed`; EWMA yalnızca yukarı çekilir."""
+        if self.latency_ewma is None or elapsed > self.latency_ewma:
+            self.latency_ewma = elapsed
+
+    def record_failure(self) -> None:
+        alpha = settings.ai_router_ewma_alpha
+        self.requests += 1
+        self.errors += 1
+        self.error_rate = alpha + (1 - alpha) * self.error_rate
+        if self.error_rate >= settings.ai_router_max_error_rate:
+            self.open_until = time.monotonic() + settings.ai_router_cooldown_seconds
+            logger.warning(f"LLM provider {self.name} marked unhealthy (error rate {self.error_rate:.2f})")
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < 5:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def to_dict(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "latency_ewma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "latency_p95": self.p95(),
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "errors": self.errors,
+            "wins": self.wins,
+        }
+
+
+class LLMRouter:
+    """
+    İsteği en hızlı sağlıklı sağlayıcıya gönderir. Yanıt, o sağlayıcının p95
+    gecikmesinden uzun sürerse ikinci sağlayıcıya kopya (hedge) istek atar;
+    önce dönen kazanır, diğeri iptal edilir. Hata durumunda sıradakine geçer.
+    """
+
+    def __init__(self, providers: dict[str, CompleteFn]):
+        self.providers = providers
+        self.stats = {name: ProviderStats(name) for name in providers}
+        self.hedged_requests = 0
+        self.failovers = 0
+
+    def ranked(self) -> list[str]:
+        """Sağlıklılar önce, kendi aralarında EWMA gecikmesine göre (ölçümü olmayan önce denenir)."""
+        order = list(self.providers)
+        return sorted(
+            order,
+            key=lambda n: (not self.stats[n].healthy, self.stats[n].latency_ewma or 0.0, order.index(n)),
+        )
+
+    def hedge_delay(self, name: str) -> float:
+        p95 = self.stats[name].p95()
+        if p95 is None:
+            return settings.ai_hedge_default_delay
+        return min(settings.ai_hedge_max_delay, max(settings.ai_hedge_min_delay, p95))
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        order = self.ranked()
+        if not order:
+            raise RuntimeError("No AI provider configured")
+
+        primary, remaining = order[0], order[1:]
+        tasks: dict[asyncio.Task, str] = {self._start(primary, prompt, max_tokens): primary}
+        can_hedge = settings.ai_hedge_enabled
+        last_error: Optional[BaseException] = None
+        won = False
+
+        try:
+            while tasks:
+                timeout = self.hedge_delay(primary) if can_hedge and remaining else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Birincil sağlayıcı p95'i aştı: hedge isteği gönder
+                    can_hedge = False
+                    name = remaining.pop(0)
+                    self.hedged_requests += 1
+                    tasks[self._start(name, prompt, max_tokens)] = name
+                    continue
+
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is None:
+                        self.stats[name].wins += 1
+                        won = True
+                        return task.result()
+                    last_error = task.exception()
+
+                if not tasks and remaining:
+                    self.failovers += 1
+                    name = remaining.pop(0)
+                    tasks[self._start(name, prompt, max_tokens)] = name
+        finally:
+            # Kaybeden (veya iptal edilen çağrıya ait) istekleri iptal et
+            for task in tasks:
+                if not task.done():
+                    task.cancel(HEDGE_LOST if won else None)
+                elif not task.cancelled():
+                    task.exception()
+
+        raise last_error or RuntimeError("All AI providers failed")
+
+    def _start(self, name: str, prompt: str, max_tokens: int) -> asyncio.Task:
+        return asyncio.ensure_future(self._run(name, prompt, max_tokens))
+
+    async def _run(self, name: str, prompt: str, max_tokens: int) -> str:
+        started = time.perf_counter()
+        try:
+            result = await self.providers[name](prompt, max_tokens)
+        except asyncio.CancelledError as e:
+            # Çağıranın iptali sağlayıcı hakkında bilgi taşımaz; yalnızca hedge kaybı kaydedilir
+            if e.args and e.args[0] == HEDGE_LOST:
+                self.stats[name].record_cancelled(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            self.stats[name].record_failure()
+            logger.warning(f"LLM provider {name} failed: {e}")
+            raise
+        self.stats[name].record_success(time.perf_counter() - started)
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "providers": {name: s.to_dict() for name, s in self.stats.items()},
+            "hedged_requests": self.hedged_requests,
+            "failovers": self.failovers,
+        }
@@ -0,0 +1,218 @@
+"""
+Yerel Tatoeba/ManyThings korpusu (EN\tTR satırları) için disk üzerinde indeks.
+
+İndeks bir kez oluşturulur ve mmap ile açılır:
+    sentences.bin         UTF-8 "en\ttr" kayıtları art arda
+    sentence_offsets.bin  uint64, cümle i = sentences[off[i]:off[i+1]]
+    postings.bin          uint32 cümle id'leri, token'a göre gruplu
+    tokens.tsv            token \t postings başlangıcı \t adet
+    meta.json             kaynak dosya imzası (değişirse indeks yeniden kurulur)
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+TOKEN_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _source_signature(source: Path) -> dict:
+    st = source.stat()
+    return {"format": INDEX_FORMAT, "source": str(source.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def build_index(source: Path, index_dir: Path) -> None:
+    """Kaynak dosyadan indeksi oluşturur. Önce geçici dizine yazar, sonra yerine taşır."""
+    postings: dict[str, list[int]] = defaultdict(list)
+    offsets = array("Q", [0])
+    count = 0
+
+    index_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".index-", dir=index_dir.parent))
+    try:
+        with open(source, "r", encoding="utf-8") as src, open(tmp_dir / "sentences.bin", "wb") as out:
+            position = 0
+            for line in src:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) < 2:
+                    continue
+                english, turkish = parts[0].strip(), parts[1].strip()
+                if not english or not turkish:
+                    continue
+                record = f"{english}\t{turkish}".encode("utf-8")
+                out.write(record)
+                position += len(record)
+                offsets.append(position)
+                for token in set(tokenize(english)):
+                    postings[token].append(count)
+                count += 1
+
+        with open(tmp_dir / "sentence_offsets.bin", "wb") as f:
+            offsets.tofile(f)
+
+        flat = array("I")
+        with open(tmp_dir / "tokens.tsv", "w", encoding="utf-8") as f:
+            for token in sorted(postings):
+                ids = postings[token]
+                f.write(f"{token}\t{len(flat)}\t{len(ids)}\n")
+                flat.extend(ids)
+        with open(tmp_dir / "postings.bin", "wb") as f:
+            flat.tofile(f)
+
+        with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({**_source_signature(source), "sentences": count, "tokens": len(postings)}, f)
+
+        if index_dir.exists():
+            shutil.rmtree(index_dir)
+        os.replace(tmp_dir, index_dir)
+        logger.info(f"Built corpus index: {count} sentences, {len(postings)} tokens -> {index_dir}")
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _contains(ids: memoryview, value: int) -> bool:
+    pos = bisect_left(ids, value)
+    return pos < len(ids) and ids[pos] == value
+
+
+def _map_array(path: Path, typecode: str) -> tuple[Optional[mmap.mmap], memoryview]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(array(typecode))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm).cast(typecode)
+
+
+class CorpusIndex:
+    """mmap ile açılmış, salt okunur korpus indeksi."""
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = index_dir
+        with open(index_dir / "sentences.bin", "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._sentences_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._offsets_mm, self.offsets = _map_array(index_dir / "sentence_offsets.bin", "Q")
+        self._postings_mm, self.postings = _map_array(index_dir / "postings.bin", "I")
+        self.tokens: dict[str, tuple[int, int]] = {}
+        with open(index_dir / "tokens.tsv", "r", encoding="utf-8") as f:
+            for line in f:
+                token, start, count = line.rstrip("\n").split("\t")
+                self.tokens[token] = (int(start), int(count))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def sentence(self, sentence_id: int) -> tuple[str, str]:
+        raw = self._sentences_mm[self.offsets[sentence_id]:self.offsets[sentence_id + 1]]
+        english, _, turkish = raw.decode("utf-8").partition("\t")
+        return english, turkish
+
+    def _ids(self, token: str) -> memoryview:
+        entry = self.tokens.get(token)
+        if entry is None:
+            return self.postings[0:0]
+        start, count = entry
+        return self.postings[start:start + count]
+
+    def search(self, query: str, limit: int) -> list[int]:
+        """Sorgudaki tüm token'ları içeren ilk `limit` cümle id'si."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        if len(terms) == 1:
+            return self._ids(terms[0])[:limit].tolist()
+        # En kısa posting listesi üzerinden kesişim (listeler artan sırada, ikili arama)
+        lists = sorted((self._ids(t) for t in set(terms)), key=len)
+        others = lists[1:]
+        result = []
+        for sid in lists[0]:
+            if all(_contains(other, sid) for other in others):
+                result.append(sid)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def close(self) -> None:
+        self.offsets.release()
+        self.postings.release()
+        for mm in (self._sentences_mm, self._offsets_mm, self._postings_mm):
+            if mm is not None:
+                mm.close()
+
+
+def open_index(source: Path, index_dir: Path) -> CorpusIndex:
+    """İndeks yoksa veya kaynak değiştiyse yeniden oluşturur, sonra açar."""
+    meta_path = index_dir / "meta.json"
+    current = None
+    if meta_path.exists():
+        with open(meta_path, "r", encoding="utf-8") as f:
+            current = json.load(f)
+    expected = _source_signature(source)
+    if current is None or any(current.get(k) != v for k, v in expected.items()):
+        build_index(source, index_dir)
+    return CorpusIndex(index_dir)
+
+
+class LocalCorpusDataSource:
+    """
+    TatoebaDataSource'un ağsız karşılığı: aynı get_sentences arayüzü,
+    yerel EN-TR korpus indeksinden milisaniye altında yanıt verir.
+    """
+
+    def __init__(self, source: Path, index_dir: Path):
+        self.source = Path(source)
+        self.index_dir = Path(index_dir)
+        self._index: Optional[CorpusIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> CorpusIndex:
+        """İndeksi (gerekirse oluşturarak) açar; dosya işlemleri thread'de yapılır."""
+        if self._index is None:
+            async with self._lock:
+                if self._index is None:
+                    self._index = await asyncio.to_thread(open_index, self.source, self.index_dir)
+        return self._index
+
+    async def get_sentences(
+        self,
+        word: str,
+        from_lang: str = "eng",
+        to_lang: str = "tur",
+        limit: int = 5
+    ) -> list[dict]:
+        """
+        Bir kelime için örnek cümleler getirir (yalnızca eng -> tur).
+
+        Returns:
+            [{"original": "...", "translation": "...", "audio_url": None}]
+        """
+        if from_lang != "eng" or to_lang != "tur":
+            return []
+        index = self._index or await self.load()
+        sentences = []
+        for sid in index.search(word, limit):
+            english, turkish = index.sentence(sid)
+            sentences.append({"original": english, "translation": turkish, "audio_url": None})
+        return sentences
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
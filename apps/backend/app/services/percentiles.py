@@ -0,0 +1,136 @@
+"""
+Seviye bazlı quiz skoru dağılımları (KLL taslakları) ve yüzdelik sorguları.
+
+Her worker gönderimleri hem okunan görünüme (view) hem de henüz
+kaydedilmemiş bir delta taslağına ekler. Periyodik flush, delta'yı
+percentile_sketches tablosundaki ortak taslakla satır kilidi altında
+birleştirir, sonra tüm kayıtları yeniden yükleyip görünümü değiştirir
+(bekleyen yerel delta'lar üstüne eklenir); böylece diğer worker'ların
+gönderimleri de görünür hale gelir.
+"""
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.sketches import KLLSketch
+from app.db.session import async_session
+
+logger = logging.getLogger(__name__)
+
+LOAD_SKETCHES = text("SELECT name, data FROM percentile_sketches")
+LOCK_SKETCHES = text("SELECT name, data FROM percentile_sketches WHERE name = ANY(:names) ORDER BY name FOR UPDATE")
+SAVE_SKETCH = text("""
+    INSERT INTO percentile_sketches (name, data, updated_at) VALUES (:name, :data, NOW())
+    ON CONFLICT (name) DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+""")
+
+
+def score_key(level: str) -> str:
+    return f"score:{level}"
+
+
+class PercentileService:
+    def __init__(self):
+        self.views: dict[str, KLLSketch] = {}
+        self.deltas: dict[str, KLLSketch] = {}
+        self.flushes = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _new_sketch(self) -> KLLSketch:
+        return KLLSketch(k=settings.percentile_sketch_k)
+
+    async def startup(self) -> None:
+        try:
+            async with async_session() as session:
+                rows = (await session.execute(LOAD_SKETCHES)).all()
+            self.views = {row.name: KLLSketch.from_dict(json.loads(row.data)) for row in rows}
+        except Exception as e:
+            logger.error(f"Loading percentile sketches failed, starting empty: {e}")
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Final percentile sketch flush failed: {e}")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.percentile_flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Percentile sketch flush failed: {e}")
+
+    def record_score(self, level: Optional[str], score: float) -> None:
+        if not level:
+            return
+        key = score_key(level)
+        for sketches in (self.views, self.deltas):
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = self._new_sketch()
+            sketch.update(score)
+
+    def score_percentile(self, level: Optional[str], score: float) -> Optional[float]:
+        """Bu seviyedeki quiz skorlarının yüzde kaçı `score`'dan düşük (0-100)."""
+        sketch = self.views.get(score_key(level)) if level else None
+        if sketch is None or sketch.n < settings.percentile_min_samples:
+            return None
+        rank = sketch.rank(score)
+        return round(rank * 100, 1) if rank is not None else None
+
+    async def flush(self) -> None:
+        """
+        Delta taslaklarını ortak kayıtla birleştirir (tek transaction, isim sırasıyla
+        kilit), ardından tüm kayıtları yeniden yükler. Delta olmasa da yükleme yapılır;
+        diğer worker'ların birleştirdikleri ancak böyle görünür.
+        """
+        async with self._lock:
+            deltas, self.deltas = self.deltas, {}
+            try:
+                async with async_session() as session:
+                    if deltas:
+                        rows = await session.execute(LOCK_SKETCHES, {"names": sorted(deltas)})
+                        stored = {row.name: KLLSketch.from_dict(json.loads(row.data)) for row in rows}
+                        for name in sorted(deltas):
+                            sketch = stored.get(name) or self._new_sketch()
+                            sketch.merge(deltas[name])
+                            await session.execute(SAVE_SKETCH, {"name": name, "data": json.dumps(sketch.to_dict())})
+                        await session.commit()
+                    rows = (await session.execute(LOAD_SKETCHES)).all()
+            except Exception:
+                # Kaybetmemek için bir sonraki flush'a geri koy
+                for name, delta in deltas.items():
+                    pending = self.deltas.get(name)
+                    if pending is not None:
+                        delta.merge(pending)
+                    self.deltas[name] = delta
+                raise
+            views = {row.name: KLLSketch.from_dict(json.loads(row.data)) for row in rows}
+            # Flush sırasında gelen, henüz kaydedilmemiş güncellemeler görünüme de eklenir
+            for name, pending in self.deltas.items():
+                sketch = views.get(name)
+                if sketch is None:
+                    sketch = views[name] = self._new_sketch()
+                sketch.merge(pending.copy())
+            self.views = views
+            self.flushes += 1
+
+    def stats(self) -> dict:
+        return {
+            "sketches": {name: sketch.n for name, sketch in sorted(self.views.items())},
+            "pending": sum(sketch.n for sketch in self.deltas.values()),
+            "flushes": self.flushes,
+        }
+
+
+percentile_service = PercentileService()
@@ -0,0 +1,209 @@
+"""
+Quiz gönderiminin tek transaction'da, soru sayısından bağımsız sabit sayıda
+ifadeyle kaydedilmesi:
+
+    1. Gönderilen kelimelerin mevcut tekrar planları (SELECT ... FOR UPDATE)
+    2. Tek CTE: quiz_sessions INSERT, tekrar planları toplu UPDATE/INSERT
+       (unnest), user_stats upsert + seviye hesabı, hedef seviyesinin
+       güncellenmesi, user_daily_stats (günlük özet + seri) upsert
+    3. COMMIT
+
+SM-2 hesabı Python'da (SpacedRepetitionEngine) yapılır, sonuçlar diziler
+halinde tek ifadeye gönderilir.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.progression import LEVEL_THRESHOLDS
+from app.core.spaced_repetition import SpacedRepetitionEngine
+from app.schemas.quiz import QuizResultDetail, QuizSessionCreate
+
+logger = logging.getLogger(__name__)
+
+sr_engine = SpacedRepetitionEngine()
+
+# Sabit eşikler SQL'e literal olarak gömülür (kullanıcı girdisi değildir)
+_LEVELS = "(VALUES " + ", ".join(f"('{level}', {xp})" for level, xp in LEVEL_THRESHOLDS.items()) + ")"
+
+LOCK_SCHEDULES = text("""
+    SELECT word_id, interval, repetitions, easiness_factor
+    FROM review_schedules
+    WHERE user_id = :uid_str AND word_id = ANY(:word_ids)
+    FOR UPDATE
+""").bindparams(bindparam("word_ids", type_=ARRAY(Integer)))
+
+SUBMIT_QUIZ = text(f"""
+    WITH new_session AS (
+        INSERT INTO quiz_sessions (user_id, score, total_questions, correct_answers, category_breakdown, completed_at, created_at)
+        VALUES (CAST(:uid AS UUID), :score, :total_questions, :correct_answers, :category_breakdown, NOW(), NOW())
+        RETURNING id, completed_at, created_at
+    ),
+    sched AS (
+        SELECT *
+        FROM unnest(
+            CAST(:word_ids AS INTEGER[]), CAST(:next_reviews AS TIMESTAMPTZ[]), CAST(:intervals AS INTEGER[]),
+            CAST(:repetitions AS INTEGER[]), CAST(:easiness AS DOUBLE PRECISION[]), CAST(:is_new AS BOOLEAN[])
+        ) AS d(word_id, next_review, interval, repetitions, easiness_factor, is_new)
+    ),
+    updated_schedules AS (
+        UPDATE review_schedules rs
+        SET next_review = d.next_review, interval = d.interval, repetitions = d.repetitions,
+            easiness_factor = d.easiness_factor, last_reviewed = NOW()
+        FROM sched d
+        WHERE NOT d.is_new AND rs.user_id = :uid_str AND rs.word_id = d.word_id
+        RETURNING rs.id
+    ),
+    inserted_schedules AS (
+        INSERT INTO review_schedules (user_id, word_id, next_review, interval, repetitions, easiness_factor, last_reviewed)
+        SELECT :uid_str, d.word_id, d.next_review, d.interval, d.repetitions, d.easiness_factor, NOW()
+        FROM sched d
+        WHERE d.is_new
+        RETURNING id
+    ),
+    old_stats AS (
+        SELECT level FROM user_stats WHERE user_id = CAST(:uid AS UUID)
+    ),
+    stats AS (
+        INSERT INTO user_stats (user_id, xp, quiz_count, score_sum, total_questions, updated_at)
+        VALUES (CAST(:uid AS UUID), :correct_answers, 1, :score, :total_questions, NOW())
+        ON CONFLICT (user_id) DO UPDATE SET
+            xp = user_stats.xp + EXCLUDED.xp,
+            quiz_count = user_stats.quiz_count + 1,
+            score_sum = user_stats.score_sum + EXCLUDED.score_sum,
+            total_questions = user_stats.total_questions + EXCLUDED.total_questions,
+            -- En yüksek ulaşılan seviye; mevcut seviyenin altına inilmez
+            level = COALESCE(
+                (
+                    SELECT t.level FROM {_LEVELS} AS t(level, xp)
+                    WHERE user_stats.level IS NOT NULL
+                      AND t.xp <= user_stats.xp + EXCLUDED.xp
+                      AND t.xp > COALESCE((SELECT c.xp FROM {_LEVELS} AS c(level, xp) WHERE c.level = user_stats.level), 0)
+                    ORDER BY t.xp DESC
+                    LIMIT 1
+                ),
+                user_stats.level
+            ),
+            updated_at = NOW()
+        RETURNING xp, current_goal_id, level
+    ),
+    daily AS (
+        -- Gün UTC'ye göre; günün ilk gönderimi dünkü seriyi bir uzatır
+        INSERT INTO user_daily_stats (user_id, day, quizzes, questions, correct, reviews, streak)
+        VALUES (
+            CAST(:uid AS UUID), CAST(timezone('UTC', NOW()) AS DATE), 1, :total_questions, :correct_answers, :reviews,
+            COALESCE((
+                SELECT y.streak FROM user_daily_stats y
+                WHERE y.user_id = CAST(:uid AS UUID) AND y.day = CAST(timezone('UTC', NOW()) AS DATE) - 1
+            ), 0) + 1
+        )
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            quizzes = user_daily_stats.quizzes + 1,
+            questions = user_daily_stats.questions + EXCLUDED.questions,
+            correct = user_daily_stats.correct + EXCLUDED.correct,
+            reviews = user_daily_stats.reviews + EXCLUDED.reviews
+        RETURNING streak
+    ),
+    goal AS (
+        UPDATE learning_goals g
+        SET level = s.level
+        FROM stats s
+        WHERE g.id = s.current_goal_id AND s.level IS NOT NULL AND g.level IS DISTINCT FROM s.level
+        RETURNING g.level
+    )
+    SELECT ns.id, ns.completed_at, ns.created_at,
+           s.xp, s.level AS level, (SELECT level FROM old_stats) AS old_level,
+           (SELECT streak FROM daily) AS streak,
+           (SELECT count(*) FROM updated_schedules) + (SELECT count(*) FROM inserted_schedules) AS schedules
+    FROM new_session ns, stats s
+""").bindparams(
+    bindparam("word_ids", type_=ARRAY(Integer)),
+    bindparam("next_reviews", type_=ARRAY(DateTime(timezone=True))),
+    bindparam("intervals", type_=ARRAY(Integer)),
+    bindparam("repetitions", type_=ARRAY(Integer)),
+    bindparam("easiness", type_=ARRAY(Float)),
+    bindparam("is_new", type_=ARRAY(Boolean)),
+)
+
+
+@dataclass
+class SubmissionResult:
+    id: int
+    completed_at: datetime
+    created_at: datetime
+    xp: int
+    level: Optional[str]
+    old_level: Optional[str]  # Gönderimden önceki seviye (quiz bu seviyede çözüldü)
+    streak: int
+    new_level: Optional[str]
+
+
+def quality_for(result: QuizResultDetail) -> int:
+    # Quality: 5 = Correct + Fast, 3 = Correct + Slow, 0 = Incorrect
+    # Simplified logic for now: Correct = 4, Incorrect = 1
+    return 4 if result.is_correct else 1
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+async def submit_quiz(session: AsyncSession, user_id: UUID, payload: QuizSessionCreate) -> SubmissionResult:
+    """Gönderimi kaydeder ve commit eder; hata durumunda rollback çağıran tarafa aittir."""
+    results = [r for r in payload.results or [] if r.word_id]
+    word_ids = list(dict.fromkeys(r.word_id for r in results))
+
+    existing: dict[int, tuple[int, int, float]] = {}
+    if word_ids:
+        rows = await session.execute(LOCK_SCHEDULES, {"uid_str": str(user_id), "word_ids": word_ids})
+        existing = {row.word_id: (row.interval, row.repetitions, row.easiness_factor) for row in rows}
+
+    # Aynı kelime birden fazla geçerse sonuçlar sırayla uygulanır
+    planned: dict[int, tuple] = {}
+    for res in results:
+        if res.word_id in planned:
+            state = planned[res.word_id][1:4]
+        elif res.word_id in existing:
+            state = existing[res.word_id]
+        else:
+            init = sr_engine.create_initial_schedule()
+            state = (init.interval, init.repetitions, init.easiness_factor)
+        data = sr_engine.calculate_next_review(*state, quality_for(res))
+        planned[res.word_id] = (data.next_review, data.interval, data.repetitions, data.easiness_factor)
+
+    row = (await session.execute(SUBMIT_QUIZ, {
+        "uid": str(user_id),
+        "uid_str": str(user_id),
+        "score": payload.score,
+        "total_questions": payload.total_questions,
+        "correct_answers": payload.correct_answers,
+        "category_breakdown": payload.category_breakdown,
+        "word_ids": list(planned),
+        "next_reviews": [_utc(p[0]) for p in planned.values()],
+        "intervals": [p[1] for p in planned.values()],
+        "repetitions": [p[2] for p in planned.values()],
+        "easiness": [p[3] for p in planned.values()],
+        "is_new": [word_id not in existing for word_id in planned],
+        "reviews": len(results),
+    })).one()
+    await session.commit()
+
+    new_level = row.level if row.level is not None and row.level != row.old_level and row.old_level is not None else None
+    if new_level:
+        logger.info(f"User {user_id} leveled up to {new_level}!")
+    return SubmissionResult(
+        id=row.id,
+        completed_at=row.completed_at,
+        created_at=row.created_at,
+        xp=row.xp,
+        level=row.level,
+        old_level=row.old_level,
+        streak=row.streak,
+        new_level=new_level,
+    )
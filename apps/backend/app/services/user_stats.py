@@ -0,0 +1,76 @@
+"""
+user_stats satırının okunması ve artımlı güncellenmesi.
+
+Quiz gönderimi (app.services.quiz_submission) ve onboarding bu satırı
+kendi transaction'ları içinde upsert eder; istatistik ve hedef
+endpoint'leri geçmişi yeniden toplamak yerine tek satır okur.
+"""
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.learning_goal import LearningGoal
+from app.models.quiz import QuizSession
+from app.models.user_stats import UserStats
+
+
+async def set_current_goal(session: AsyncSession, user_id: UUID, goal: LearningGoal) -> None:
+    """Yeni hedefi güncel hedef yapar (goal.id için önce flush edilmiş olmalı)."""
+    stmt = pg_insert(UserStats).values(user_id=user_id, current_goal_id=goal.id, level=goal.level)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={"current_goal_id": goal.id, "level": goal.level, "updated_at": func.now()},
+    )
+    await session.execute(stmt)
+
+
+async def get_stats_version(session: AsyncSession, user_id: UUID) -> str:
+    """
+    İstatistik yanıt cache'i için sürüm: quiz gönderimi ve hedef değişikliği
+    quiz_count / updated_at'i aynı transaction'da değiştirir. DB'den okunduğu için
+    her worker aynı değeri görür (primary key ile tek satır).
+    """
+    result = await session.execute(
+        select(UserStats.quiz_count, UserStats.updated_at).where(UserStats.user_id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return "0"
+    updated = row.updated_at.timestamp() if row.updated_at is not None else 0.0
+    return f"{row.quiz_count}.{updated:.6f}"
+
+
+async def get_stats_with_goal(session: AsyncSession, user_id: UUID) -> tuple[UserStats | None, LearningGoal | None]:
+    """user_stats satırı ve güncel hedef, tek sorguda (primary key + join)."""
+    result = await session.execute(
+        select(UserStats, LearningGoal)
+        .outerjoin(LearningGoal, LearningGoal.id == UserStats.current_goal_id)
+        .where(UserStats.user_id == user_id)
+    )
+    row = result.first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+async def compute_stats_from_history(session: AsyncSession, user_id: UUID) -> UserStats:
+    """
+    user_stats satırı olmayan kullanıcılar için geçmişten hesaplar (yazmadan).
+    Migration backfill'i sonrası yalnızca hiç quiz/hedefi olmayan kullanıcılar buraya düşer.
+    """
+    result = await session.execute(
+        select(
+            func.count(QuizSession.id),
+            func.coalesce(func.sum(QuizSession.score), 0),
+            func.coalesce(func.sum(QuizSession.correct_answers), 0),
+            func.coalesce(func.sum(QuizSession.total_questions), 0),
+        ).where(QuizSession.user_id == user_id)
+    )
+    quiz_count, score_sum, xp, total_questions = result.one()
+    return UserStats(
+        user_id=user_id,
+        xp=int(xp),
+        quiz_count=quiz_count,
+        score_sum=float(score_sum),
+        total_questions=int(total_questions),
+    )
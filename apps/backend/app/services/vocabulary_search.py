@@ -0,0 +1,350 @@
+"""
+Kelime arama: word ve translation üzerinde önek (autocomplete) ve yazım
+hatası toleranslı eşleşme.
+
+Bellek içi indeks içerik kataloğundan kurulur:
+  - terimler: katlanmış (fold) tam metinler ve içlerindeki tek tek kelimeler,
+    sıralı liste; önek araması ikili arama ile
+  - (trigram, konum) -> terim id'leri; bir düzenleme en fazla 3 trigramı bozar
+    ve kalanları en fazla 1 konum kaydırır. Bu yüzden k düzenlemeyle eşleşen
+    terim, sorgunun trigramlarından en az G - 3k tanesini ±k konumda içerir
+    (q-gram filtresi). Adaylar uzunluk ve karakter maskesi filtresinden sonra
+    sınırlı Damerau-Levenshtein (OSA) ile doğrulanır. Bulanık arama yalnızca
+    önek eşleşmesi yoksa çalışır.
+Katlama Türkçe İ/ı farkını yok sayar: "istanbul", "İSTANBUL" ve "ıstanbul" aynı terimdir.
+Katalog yoksa veya indeks henüz kurulmadıysa pg_trgm sorgusuna düşülür.
+
+İndeks saf Python ile kurulur (~120k kelimede ~6 sn). Açılışta warm() kurulumu
+bekler, yani ilk istekler SQL'e düşmez ama açılış o kadar uzar. İçerik
+değişince yeni indeks arka planda kurulur, bu sırada eski indeks hizmet verir.
+SQL yedeği yalnızca hiç indeks yokken (katalog kapalı/yüklenemedi ya da ilk
+kurulum başarısız) kullanılır; sıralaması farklıdır (pg_trgm similarity):
+eşleşme türü aynı olsa da sonuçların sırası bellek içi aramayla birebir tutmaz.
+"""
+import asyncio
+import logging
+import re
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterator, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.services.content_catalog import ContentCatalog, content_catalog
+
+logger = logging.getLogger(__name__)
+
+FIELD_WORD = 0
+FIELD_TRANSLATION = 1
+FIELD_NAMES = ("word", "translation")
+MATCH_EXACT, MATCH_PREFIX, MATCH_FUZZY = 0, 1, 2
+MATCH_NAMES = ("exact", "prefix", "fuzzy")
+
+MAX_GRAM_POSITION = 15
+MAX_FUZZY_CANDIDATES = 2000  # En çok ortak trigramı olanlar; gecikme üst sınırı
+_TR_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+_TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+
+# pg_trgm yedeği: ifadeler migration_vocabulary_search'teki GIN indeksleriyle aynı
+SQL_FOLD_WORD = "lower(translate(word, 'İIı', 'iii'))"
+SQL_FOLD_TRANSLATION = "lower(translate(translation, 'İIı', 'iii'))"
+SEARCH_VOCABULARY_SQL = text(f"""
+    SELECT id, word, translation, level, category
+    FROM vocabulary_words
+    WHERE ({SQL_FOLD_WORD} LIKE :prefix OR {SQL_FOLD_TRANSLATION} LIKE :prefix
+           OR {SQL_FOLD_WORD} % :q OR {SQL_FOLD_TRANSLATION} % :q)
+      AND (CAST(:level AS VARCHAR) IS NULL OR level = :level)
+    ORDER BY GREATEST(similarity({SQL_FOLD_WORD}, :q), similarity({SQL_FOLD_TRANSLATION}, :q)) DESC,
+             length(word), id
+    LIMIT :limit
+""")
+
+
+def fold(value: str) -> str:
+    """Arama için normalleştirme: Türkçe İ/I/ı -> i, ardından casefold."""
+    return value.translate(_TR_FOLD).casefold()
+
+
+def _terms(value: str) -> set[str]:
+    folded = fold(value).strip()
+    terms = set(_TOKEN_RE.findall(folded))
+    if folded:
+        terms.add(folded)
+    return terms
+
+
+def _positional_trigrams(padded: str) -> list[str]:
+    """Trigram + konum kovası (tek karakter); konumu MAX_GRAM_POSITION'dan büyükler aynı kovada."""
+    return [padded[i:i + 3] + chr(48 + min(i, MAX_GRAM_POSITION)) for i in range(len(padded) - 2)]
+
+
+def _char_mask(value: str) -> int:
+    mask = 0
+    for ch in value:
+        mask |= 1 << (ord(ch) & 63)
+    return mask
+
+
+def _max_distance(query: str) -> int:
+    # Kısa sorgularda tek harf bile anlamı değiştirir; yalnızca önek
+    if len(query) <= 3:
+        return 0
+    return min(1 if len(query) <= 7 else 2, settings.vocabulary_search_max_distance)
+
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment mesafesi; `limit`'i aşarsa limit + 1.
+    Yalnızca |i - j| <= limit bandı hesaplanır (bant dışı hücreler zaten limit'i aşar).
+    """
+    n, m = len(a), len(b)
+    if abs(n - m) > limit:
+        return limit + 1
+    over = limit + 1
+    before = None
+    previous = [j if j <= limit else over for j in range(m + 1)]
+    for i in range(1, n + 1):
+        current = [over] * (m + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        ai = a[i - 1]
+        for j in range(max(1, i - limit), min(m, i + limit) + 1):
+            bj = b[j - 1]
+            value = previous[j - 1] + (ai != bj)
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and ai == b[j - 2] and a[i - 2] == bj and before[j - 2] + 1 < value:
+                value = before[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        before, previous = previous, current
+    return previous[m] if previous[m] <= limit else over
+
+
+class SearchIndex:
+    def __init__(self, catalog: ContentCatalog):
+        started = time.perf_counter()
+        self.catalog = catalog
+        postings: dict[str, list[tuple[bool, int]]] = {}
+        for row_no in range(len(catalog)):
+            word, translation, _ = catalog.text_fields(row_no)
+            for field, value in ((FIELD_WORD, word), (FIELD_TRANSLATION, translation)):
+                folded = fold(value or "").strip()
+                for term in _terms(value or ""):
+                    # Alanın tamamı bu terim olan satırlar, terimi yalnızca içerenlerden önce
+                    postings.setdefault(term, []).append((term != folded, row_no * 2 + field))
+
+        self.terms = sorted(postings)
+        self.lengths = array("H", (min(len(term), 65535) for term in self.terms))
+        self.masks = [_char_mask(term) for term in self.terms]
+        # Terim i'nin eşleşmeleri: entries[offsets[i]:offsets[i+1]], her biri satır * 2 + alan
+        self.offsets = array("I", [0])
+        self.entries = array("I")
+        grams: dict[str, array] = {}
+        for term_id, term in enumerate(self.terms):
+            self.entries.extend(entry for _, entry in sorted(postings[term]))
+            self.offsets.append(len(self.entries))
+            for key in set(_positional_trigrams(f"  {term} ")):
+                ids = grams.get(key)
+                if ids is None:
+                    ids = grams[key] = array("I")
+                ids.append(term_id)
+        self.grams = grams
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Vocabulary search index v{catalog.version}: {len(self.terms)} terms, "
+                    f"{len(grams)} positional trigrams in {self.build_seconds:.2f}s")
+
+    def _prefix_terms(self, query: str) -> Iterator[int]:
+        """`query` ile başlayan terimler, alfabetik (tam eşleşme varsa ilk sırada)."""
+        for term_id in range(bisect_left(self.terms, query), len(self.terms)):
+            if not self.terms[term_id].startswith(query):
+                return
+            yield term_id
+
+    def _fuzzy_terms(self, query: str, k: int) -> list[tuple[int, int]]:
+        """(sıra anahtarı, terim id): tam terim ya da terimin önekiyle en fazla k düzenleme."""
+        # Sorgunun sonuna boşluk eklenmez: önekle eşleşen terimler de aynı trigramları taşır
+        keys = _positional_trigrams(f"  {query}")
+        shared = Counter()
+        for key in keys:
+            gram, position = key[:3], ord(key[3]) - 48
+            buckets = {min(p, MAX_GRAM_POSITION) for p in range(max(0, position - k), position + k + 1)}
+            for bucket in buckets:
+                ids = self.grams.get(gram + chr(48 + bucket))
+                if ids is not None:
+                    shared.update(ids)
+        # Her düzenleme en fazla 3 trigramı bozar (yer değiştirmede 4; bu nadir kayıp kabul edilir)
+        threshold = max(1, len(keys) - 3 * k)
+        candidates = [term_id for term_id, count in shared.items() if count >= threshold]
+        if len(candidates) > MAX_FUZZY_CANDIDATES:
+            candidates = [term_id for term_id, _ in shared.most_common(MAX_FUZZY_CANDIDATES)]
+
+        found = []
+        q_len, q_mask = len(query), _char_mask(query)
+        for term_id in candidates:
+            length = self.lengths[term_id]
+            if length < q_len - k:
+                continue
+            term = self.terms[term_id]
+            # Her düzenleme maskede en fazla 2 biti değiştirir
+            if length <= q_len + k and (q_mask ^ self.masks[term_id]).bit_count() <= 2 * k:
+                full = _distance(query, term, k)
+                if full <= k:
+                    found.append((full, term_id))
+                    continue
+            if length > q_len and (q_mask ^ _char_mask(term[:q_len])).bit_count() <= 2 * k:
+                prefix = _distance(query, term[:q_len], k)
+                if prefix <= k:
+                    found.append((k + 1 + prefix, term_id))  # Önek eşleşmeleri tam terimlerden sonra
+        found.sort(key=lambda item: (item[0], self.lengths[item[1]], item[1]))
+        return found
+
+    def search(self, query: str, limit: int, level: Optional[str] = None) -> list[dict]:
+        q = fold(query).strip()
+        if not q:
+            return []
+        results: dict[int, tuple] = {}  # satır -> (eşleşme türü, alan, sıra)
+        # Katalogda her seviye ardışık bir satır aralığıdır
+        span_start, span_count = self.catalog.levels.get(level, (0, 0)) if level is not None else (0, len(self.catalog))
+
+        def collect(term_id: int, match: int) -> bool:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            for entry in self.entries[start:end]:
+                row_no, field = divmod(entry, 2)
+                if row_no in results:
+                    continue
+                if not span_start <= row_no < span_start + span_count:
+                    continue
+                if match == MATCH_PREFIX and self.terms[term_id] == q:
+                    match = MATCH_EXACT
+                results[row_no] = (match, field, len(results))
+                if len(results) >= limit:
+                    return True
+            return False
+
+        # Önek aralığı `limit` satır toplanana kadar yürünür (level filtresi ve aynı
+        # satırın birden fazla terimi yüzünden terim sayısı satır sayısını belirlemez)
+        for term_id in self._prefix_terms(q):
+            if collect(term_id, MATCH_PREFIX):
+                break
+        # Önek eşleşmesi varsa kullanıcı yazmaya devam ediyordur; bulanık arama yalnızca sonuç yoksa
+        k = _max_distance(q)
+        if not results and k:
+            for _, term_id in self._fuzzy_terms(q, k):
+                if collect(term_id, MATCH_FUZZY):
+                    break
+
+        ordered = sorted(results.items(), key=lambda item: (item[1][0], item[1][2]))
+        return [self._item(row_no, match, field) for row_no, (match, field, _) in ordered]
+
+    def _item(self, row_no: int, match: int, field: int) -> dict:
+        word = self.catalog.word(row_no)
+        return {
+            "id": word.id,
+            "word": word.word,
+            "translation": word.translation,
+            "level": word.level,
+            "category": word.category,
+            "match": MATCH_NAMES[match],
+            "field": FIELD_NAMES[field],
+        }
+
+
+def _like_prefix(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class VocabularySearchService:
+    """
+    Güncel katalog için indeksi tutar. Katalog değişince indeks arka planda
+    yeniden kurulur; bu sırada eski indeks (eski katalog kopyasıyla) hizmet verir.
+    """
+
+    def __init__(self):
+        self.index: Optional[SearchIndex] = None
+        self.memory_searches = 0
+        self.sql_searches = 0
+        self._building: Optional[asyncio.Task] = None
+        self._failed: Optional[ContentCatalog] = None  # Kurulamayan katalog için her istekte tekrar denenmez
+
+    def _ensure_current(self) -> None:
+        catalog = content_catalog.current
+        if catalog is None or catalog is self._failed or (self.index is not None and self.index.catalog is catalog):
+            return
+        if self._building is None or self._building.done():
+            self._building = asyncio.create_task(self._build(catalog))
+
+    async def _build(self, catalog: ContentCatalog) -> None:
+        try:
+            index = await asyncio.to_thread(SearchIndex, catalog)
+        except Exception as e:
+            logger.error(f"Vocabulary search index build failed: {e}", exc_info=True)
+            self._failed = catalog
+            return
+        if content_catalog.current is catalog:
+            self.index = index
+
+    async def warm(self) -> None:
+        """
+        Açılışta indeksi kurar (katalog yüklüyse) ve bitmesini bekler; ilk aramalar
+        SQL'e düşmez, bunun bedeli kurulum süresi kadar uzayan açılıştır.
+        """
+        self._ensure_current()
+        if self._building is not None:
+            await self._building
+
+    async def search(self, session, query: str, limit: int, level: Optional[str] = None) -> list[dict]:
+        self._ensure_current()
+        if self.index is not None:
+            self.memory_searches += 1
+            return self.index.search(query, limit, level)
+
+        self.sql_searches += 1
+        q = fold(query).strip()
+        if not q:
+            return []
+        rows = (await session.execute(
+            SEARCH_VOCABULARY_SQL, {"q": q, "prefix": _like_prefix(q), "level": level, "limit": limit}
+        )).all()
+        items = []
+        for row in rows:
+            folded = {FIELD_WORD: fold(row.word), FIELD_TRANSLATION: fold(row.translation)}
+            match, field = MATCH_FUZZY, FIELD_WORD
+            for candidate in (MATCH_EXACT, MATCH_PREFIX):
+                hit = next((f for f, value in folded.items()
+                            if (value == q if candidate == MATCH_EXACT else value.startswith(q))), None)
+                if hit is not None:
+                    match, field = candidate, hit
+                    break
+            items.append({
+                "id": row.id,
+                "word": row.word,
+                "translation": row.translation,
+                "level": row.level,
+                "category": row.category,
+                "match": MATCH_NAMES[match],
+                "field": FIELD_NAMES[field],
+            })
+        items.sort(key=lambda item: MATCH_NAMES.index(item["match"]))  # Stabil: SQL sırası korunur
+        return items
+
+    def stats(self) -> dict:
+        index = self.index
+        return {
+            "terms": len(index.terms) if index is not None else 0,
+            "build_seconds": round(index.build_seconds, 3) if index is not None else 0.0,
+            "memory_searches": self.memory_searches,
+            "sql_searches": self.sql_searches,
+        }
+
+
+vocabulary_search = VocabularySearchService()
@@ -0,0 +1,157 @@
+"""
+Quiz submission: the previous ORM path (6 + 2N statements) vs.
+app.services.quiz_submission.submit_quiz (fixed statement count), for 10- and
+100-question submissions.
+
+Needs a migrated database (init_db + migration_user_stats + migration_user_daily_stats) with at least 100
+vocabulary words. A dedicated bench user is created and removed afterwards.
+Usage (from apps/backend): DATABASE_URL=... python -m benchmarks.bench_quiz_submission [ROUNDS]
+"""
+import asyncio
+import sys
+import time
+import uuid
+
+from sqlalchemy import event, func, select, text
+
+from app.core.progression import level_for_xp, next_level_info
+from app.db.session import async_session, engine
+from app.models.learning_goal import LearningGoal
+from app.models.quiz import QuizSession
+from app.models.review_schedule import ReviewSchedule
+from app.schemas.quiz import QuizResultDetail, QuizSessionCreate
+from app.services.quiz_submission import quality_for, sr_engine, submit_quiz
+
+BENCH_USER = uuid.UUID("00000000-0000-4000-8000-0000000b3c40")
+statements = 0
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+async def legacy_submit(session, user_id, payload: QuizSessionCreate) -> None:
+    """The submission path as it was before the single-transaction rewrite."""
+    new_session = QuizSession(
+        user_id=user_id,
+        score=payload.score,
+        total_questions=payload.total_questions,
+        correct_answers=payload.correct_answers,
+        category_breakdown=payload.category_breakdown,
+    )
+    session.add(new_session)
+    for res in payload.results or []:
+        q_sch = await session.execute(
+            select(ReviewSchedule).where(ReviewSchedule.user_id == str(user_id), ReviewSchedule.word_id == res.word_id)
+        )
+        schedule = q_sch.scalar_one_or_none()
+        if not schedule:
+            init = sr_engine.create_initial_schedule()
+            schedule = ReviewSchedule(
+                user_id=str(user_id), word_id=res.word_id, next_review=init.next_review, interval=init.interval,
+                repetitions=init.repetitions, easiness_factor=init.easiness_factor, last_reviewed=init.last_reviewed,
+            )
+            session.add(schedule)
+        data = sr_engine.calculate_next_review(
+            schedule.interval, schedule.repetitions, schedule.easiness_factor, quality_for(res)
+        )
+        schedule.next_review = data.next_review
+        schedule.interval = data.interval
+        schedule.repetitions = data.repetitions
+        schedule.easiness_factor = data.easiness_factor
+        schedule.last_reviewed = data.last_reviewed
+
+    xp = (await session.execute(
+        select(func.sum(QuizSession.correct_answers)).where(QuizSession.user_id == str(user_id))
+    )).scalar() or 0
+    goal = (await session.execute(
+        select(LearningGoal).where(LearningGoal.user_id == str(user_id)).order_by(LearningGoal.created_at.desc()).limit(1)
+    )).scalar_one_or_none()
+    if goal:
+        goal.level = level_for_xp(goal.level, xp)
+    await session.commit()
+    await session.refresh(new_session)
+    # Response: goal and XP were re-read after the commit
+    goal = (await session.execute(
+        select(LearningGoal).where(LearningGoal.user_id == str(user_id)).order_by(LearningGoal.created_at.desc()).limit(1)
+    )).scalar_one_or_none()
+    xp = (await session.execute(
+        select(func.sum(QuizSession.correct_answers)).where(QuizSession.user_id == str(user_id))
+    )).scalar() or 0
+    if goal:
+        next_level_info(goal.level)
+
+
+def make_payload(word_ids: list[int]) -> QuizSessionCreate:
+    results = [QuizResultDetail(word_id=w, word=f"w{w}", is_correct=i % 3 != 0) for i, w in enumerate(word_ids)]
+    correct = sum(r.is_correct for r in results)
+    return QuizSessionCreate(
+        score=100.0 * correct / len(results),
+        total_questions=len(results),
+        correct_answers=correct,
+        results=results,
+    )
+
+
+async def reset(session) -> None:
+    for table, column in (
+        ("review_schedules", "user_id::uuid"), ("user_stats", "user_id"), ("user_daily_stats", "user_id"),
+        ("quiz_sessions", "user_id"),
+        ("learning_goals", "user_id"), ("users", "id"),
+    ):
+        await session.execute(text(f"DELETE FROM {table} WHERE {column} = :uid"), {"uid": BENCH_USER})
+    await session.commit()
+
+
+async def setup(session) -> None:
+    await reset(session)
+    await session.execute(
+        text("INSERT INTO users (id, email) VALUES (:uid, 'bench-submit@example.com')"), {"uid": BENCH_USER}
+    )
+    goal_id = (await session.execute(text(
+        "INSERT INTO learning_goals (user_id, target_language, level, daily_minutes, goal_type, created_at) "
+        "VALUES (:uid, 'en', 'A1', 10, 'bench', NOW()) RETURNING id"
+    ), {"uid": BENCH_USER})).scalar()
+    await session.execute(
+        text("INSERT INTO user_stats (user_id, current_goal_id, level) VALUES (:uid, :gid, 'A1')"),
+        {"uid": BENCH_USER, "gid": goal_id},
+    )
+    await session.commit()
+
+
+async def run(label: str, submit, word_ids: list[int], rounds: int) -> None:
+    global statements
+    payload = make_payload(word_ids)
+    async with async_session() as session:
+        await setup(session)
+    elapsed = 0.0
+    statements = 0
+    for _ in range(rounds):
+        async with async_session() as session:
+            start = time.perf_counter()
+            await submit(session, BENCH_USER, payload)
+            elapsed += time.perf_counter() - start
+    print(f"{label:<8} {len(word_ids):>4} questions: {elapsed / rounds * 1000:8.2f} ms/submission, "
+          f"{statements / rounds:6.1f} statements/submission (excl. BEGIN/COMMIT)")
+
+
+async def main(rounds: int):
+    async with async_session() as session:
+        word_ids = list((await session.execute(text("SELECT id FROM vocabulary_words ORDER BY id LIMIT 100"))).scalars())
+    if len(word_ids) < 100:
+        print("Need at least 100 vocabulary_words rows")
+        return
+    try:
+        for n in (10, 100):
+            await run("legacy", legacy_submit, word_ids[:n], rounds)
+            await run("single", submit_quiz, word_ids[:n], rounds)
+    finally:
+        async with async_session() as session:
+            await reset(session)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
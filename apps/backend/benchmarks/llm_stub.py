@@ -0,0 +1,93 @@
+"""
+In-process stand-ins for the OpenAI / Anthropic HTTP APIs, for AIService(transport=...).
+Used by the check scripts in this package; nothing in app/ imports this.
+"""
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from app.core.config import settings
+
+
+def llm_stub_transport(
+    handler: Optional[Callable[[httpx.Request], Awaitable[httpx.Response]]] = None,
+) -> httpx.MockTransport:
+    """MockTransport answering every completion request (a fixed JSON body by default)."""
+    async def default_handler(request: httpx.Request) -> httpx.Response:
+        return llm_stub_response(request, '{"ok": true}')
+
+    return httpx.MockTransport(handler or default_handler)
+
+
+def llm_stub_response(request: httpx.Request, content: str) -> httpx.Response:
+    """A valid completion for the request's API (chat/completions or messages)."""
+    if request.url.path.endswith("/chat/completions"):
+        return httpx.Response(200, json={
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": settings.openai_model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+        })
+    if request.url.path.endswith("/messages"):
+        return httpx.Response(200, json={
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "model": settings.anthropic_model,
+            "content": [{"type": "text", "text": content}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": 0, "output_tokens": 0},
+        })
+    return httpx.Response(404, json={"error": "not found"})
+
+
+class StubProvider:
+    """
+    Scripted provider for one API path: optional per-prompt status sequence
+    (then 200), a fixed response delay, and counters for attempts, in-flight
+    requests and requests cancelled mid-flight. Replies "<name>: <prompt>".
+    """
+
+    def __init__(self, name: str, delay: float = 0.02):
+        self.name = name
+        self.delay = delay
+        self.script: dict[str, list[int]] = {}
+        self.attempts: dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        self.attempts[prompt] = self.attempts.get(prompt, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        statuses = self.script.get(prompt)
+        if statuses:
+            status = statuses.pop(0)
+            headers = {"retry-after": "0"} if status == 429 else {}
+            return httpx.Response(status, headers=headers, json={"error": {"message": f"stub {status}"}})
+        return llm_stub_response(request, f"{self.name}: {prompt}")
+
+
+def route_by_api(openai_stub: StubProvider, anthropic_stub: StubProvider) -> httpx.MockTransport:
+    """One transport for both SDK clients, dispatched on the request path."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        stub = openai_stub if request.url.path.endswith("/chat/completions") else anthropic_stub
+        return await stub.handle(request)
+
+    return llm_stub_transport(handler)
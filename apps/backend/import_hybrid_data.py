@@ -13,6 +13,7 @@ load_dotenv(".env")
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
+from app.db import queries
 from app.db.session import engine
 
 DATA_FILE = os.path.join("data", "curated_vocabulary.json")
@@ -64,6 +65,8 @@ async def import_data():
                 {"wid": word_id, "sid": sentence_id}
             )
             
+        await session.execute(queries.REFRESH_PRIMARY_EXAMPLES)  # Denormalized example sentences
+        await session.execute(queries.BUMP_CONTENT_VERSION)  # Invalidates cached vocabulary responses
         await session.commit()
         print("Import completed successfully! Gold Standard Dataset is live.")
 
@@ -6,6 +6,7 @@ import os
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
+from app.db import queries
 from app.db.session import engine
 from app.models.vocabulary import VocabularyWord
 from app.models.quiz import QuizQuestion
@@ -136,6 +137,8 @@ async def import_data():
                 print(f"Processed {count} sentences...")
                 await session.commit()
         
+        await session.execute(queries.REFRESH_PRIMARY_EXAMPLES)  # Denormalized example sentences
+        await session.execute(queries.BUMP_CONTENT_VERSION)  # Invalidates cached vocabulary responses
         await session.commit()
         print("Import completed successfully!")
 
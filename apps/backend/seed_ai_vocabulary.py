@@ -0,0 +1,50 @@
+import asyncio
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.db import queries
+from app.db.session import engine
+from app.services.ai_service import ai_service
+
+# Usage: python seed_ai_vocabulary.py [LEVEL] [COUNT]
+# Words are requested in batches (settings.ai_batch_size per call), so 1000 words ~ 40 LLM calls.
+
+async def seed_vocabulary(level: str, count: int):
+    await ai_service.startup()
+    try:
+        print(f"Generating {count} {level} words with AI...")
+        words = await ai_service.generate_vocabulary_words(level, count)
+        print(f"Received {len(words)} words.")
+    finally:
+        await ai_service.shutdown()
+
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        res = await session.execute(text("SELECT lower(word) FROM vocabulary_words"))
+        existing = {r[0] for r in res.all()}
+
+        inserted = 0
+        for item in words:
+            if item["word"].lower() in existing:
+                continue
+            await session.execute(
+                text("INSERT INTO vocabulary_words (word, translation, level, category, example_sentence) VALUES (:w, :t, :l, :c, :e)"),
+                {"w": item["word"], "t": item["translation"], "l": item["level"], "c": item["category"], "e": item["example_sentence"]}
+            )
+            existing.add(item["word"].lower())
+            inserted += 1
+
+        if inserted:
+            await session.execute(queries.BUMP_CONTENT_VERSION)  # Invalidates cached vocabulary responses
+        await session.commit()
+        print(f"Inserted {inserted} new words ({len(words) - inserted} already existed).")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    level_arg = sys.argv[1] if len(sys.argv) > 1 else "A1"
+    count_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(seed_vocabulary(level_arg, count_arg))
@@ -1,5 +1,10 @@
 import { supabase } from "./supabase";
 
+// Backend'in yazı sonrası döndürdüğü zaman damgası; geri gönderilince okumalar
+// hangi worker'a düşerse düşsün kısa bir süre primary DB'den yapılır.
+const LAST_WRITE_HEADER = "X-Last-Write";
+let lastWrite: string | null = null;
+
 /**
  * API çağrıları için yardımcı fonksiyon.
  * Supabase session'dan token alır ve Authorization header'ına ekler.
@@ -16,6 +21,10 @@ export async function apiFetch(
     ...(options.headers as Record<string, string>),
   };
 
+  if (lastWrite) {
+    headers[LAST_WRITE_HEADER] = lastWrite;
+  }
+
   if (token) {
     headers["Authorization"] = `Bearer ${token}`;
     // eslint-disable-next-line no-console
@@ -30,10 +39,15 @@ export async function apiFetch(
   // eslint-disable-next-line no-console
   console.log("Request headers:", { ...headers, Authorization: token ? "Bearer ***" : "None" });
 
-  return fetch(url, {
+  const response = await fetch(url, {
     ...options,
     headers,
   });
+  const written = response.headers.get(LAST_WRITE_HEADER);
+  if (written) {
+    lastWrite = written;
+  }
+  return response;
 }
 
 
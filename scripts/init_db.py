@@ -18,6 +18,10 @@ from app.models.learning_goal import Base, LearningGoal
 from app.models.user import User  # noqa: F401
 from app.models.vocabulary import VocabularyWord, UserVocabularyProgress  # noqa: F401
 from app.models.quiz import QuizQuestion, QuizSession  # noqa: F401
+from app.models.user_stats import UserStats  # noqa: F401
+from app.models.user_daily_stats import UserDailyStats  # noqa: F401
+from app.models.content_meta import ContentMeta  # noqa: F401
+from app.models.percentile_sketch import PercentileSketch  # noqa: F401
 
 
 async def init_db():
@@ -0,0 +1,47 @@
+"""
+content_meta tablosunu oluşturur (ETag / yanıt cache'i için global içerik sürümü).
+İçerik import eden scriptler her çalışmada sürümü artırır.
+Kullanım: python -m scripts.migration_content_meta
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+
+
+SQL_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS content_meta (
+    key VARCHAR(32) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+)
+"""
+
+SQL_SEED = """
+INSERT INTO content_meta (key, version) VALUES ('content', 1)
+ON CONFLICT (key) DO NOTHING
+"""
+
+
+async def migrate_content_meta():
+    """content_meta tablosunu oluşturur ve ilk sürümü ekler."""
+    engine = create_async_engine(settings.database_url, echo=True)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(SQL_CREATE_TABLE))
+        await conn.execute(text(SQL_SEED))
+        print("✅ content_meta tablosu hazır")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_content_meta())
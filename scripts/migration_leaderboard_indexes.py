@@ -0,0 +1,38 @@
+"""
+Liderlik tablosu için user_stats indekslerini ekler (ilk N ve sıra sorguları).
+Kullanım: python -m scripts.migration_leaderboard_indexes
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+
+
+SQL_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_user_stats_xp ON user_stats (xp DESC, user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_user_stats_level_xp ON user_stats (level, xp DESC, user_id)",
+]
+
+
+async def add_leaderboard_indexes():
+    """user_stats üzerinde XP sıralama indekslerini oluşturur."""
+    engine = create_async_engine(settings.database_url, echo=True)
+
+    async with engine.begin() as conn:
+        for statement in SQL_INDEXES:
+            await conn.execute(text(statement))
+        print("✅ Liderlik tablosu indeksleri hazır")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(add_leaderboard_indexes())
@@ -0,0 +1,69 @@
+"""
+percentile_sketches tablosunu oluşturur (seviye bazlı skor dağılımı taslakları).
+Taslaklar gönderimlerle birlikte dolar; geçmiş quiz skorları ile başlangıç
+dağılımı da yüklenir.
+Kullanım: python -m scripts.migration_percentile_sketches
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.sketches import KLLSketch
+from app.services.percentiles import SAVE_SKETCH, score_key
+
+
+SQL_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS percentile_sketches (
+    name VARCHAR(64) PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+)
+"""
+
+SQL_EXISTING = "SELECT name FROM percentile_sketches"
+
+# Geçmiş skorlar, kullanıcının şu anki seviyesine göre gruplanır
+SQL_HISTORY = """
+SELECT s.level, q.score
+FROM quiz_sessions q JOIN user_stats s ON s.user_id = q.user_id
+WHERE s.level IS NOT NULL
+"""
+
+
+async def migrate_percentile_sketches():
+    """percentile_sketches tablosunu oluşturur ve boşsa geçmişten doldurur."""
+    engine = create_async_engine(settings.database_url, echo=True)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(SQL_CREATE_TABLE))
+        print("✅ percentile_sketches tablosu hazır")
+
+        existing = {row.name for row in await conn.execute(text(SQL_EXISTING))}
+        sketches: dict[str, KLLSketch] = {}
+        result = await conn.stream(text(SQL_HISTORY))
+        async for row in result:
+            key = score_key(row.level)
+            if key in existing:
+                continue
+            if key not in sketches:
+                sketches[key] = KLLSketch(k=settings.percentile_sketch_k)
+            sketches[key].update(row.score)
+
+        for name, sketch in sorted(sketches.items()):
+            await conn.execute(SAVE_SKETCH, {"name": name, "data": json.dumps(sketch.to_dict())})
+            print(f"✅ {name}: {sketch.n} skor")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_percentile_sketches())
@@ -0,0 +1,76 @@
+"""
+user_daily_stats tablosunu oluşturur ve quiz geçmişinden doldurur.
+Seri (streak) değerleri ardışık günler üzerinden hesaplanır. Geçmiş
+gönderimlerde tekrar sayısı tutulmadığından reviews 0 olarak yazılır.
+Kullanım: python -m scripts.migration_user_daily_stats
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+
+
+SQL_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS user_daily_stats (
+    user_id UUID NOT NULL REFERENCES users(id),
+    day DATE NOT NULL,
+    quizzes INTEGER NOT NULL DEFAULT 0,
+    questions INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    streak INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, day)
+)
+"""
+
+# Boşluk-ada (gaps and islands): ardışık günler aynı grp değerini alır
+SQL_BACKFILL = """
+WITH days AS (
+    SELECT user_id,
+           CAST(timezone('UTC', created_at) AS DATE) AS day,
+           COUNT(*) AS quizzes,
+           SUM(total_questions) AS questions,
+           SUM(correct_answers) AS correct
+    FROM quiz_sessions
+    GROUP BY 1, 2
+),
+islands AS (
+    SELECT *, day - CAST(ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day) AS INTEGER) AS grp
+    FROM days
+)
+INSERT INTO user_daily_stats (user_id, day, quizzes, questions, correct, reviews, streak)
+SELECT user_id, day, quizzes, questions, correct, 0,
+       ROW_NUMBER() OVER (PARTITION BY user_id, grp ORDER BY day)
+FROM islands
+ON CONFLICT (user_id, day) DO UPDATE SET
+    quizzes = EXCLUDED.quizzes,
+    questions = EXCLUDED.questions,
+    correct = EXCLUDED.correct,
+    streak = EXCLUDED.streak
+"""
+
+
+async def migrate_user_daily_stats():
+    """user_daily_stats tablosunu oluşturur ve backfill yapar."""
+    engine = create_async_engine(settings.database_url, echo=True)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(SQL_CREATE_TABLE))
+        print("✅ user_daily_stats tablosu hazır")
+
+        result = await conn.execute(text(SQL_BACKFILL))
+        print(f"✅ {result.rowcount} günlük özet quiz geçmişinden hesaplandı")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_user_daily_stats())
@@ -0,0 +1,88 @@
+"""
+user_stats tablosunu oluşturur ve mevcut quiz geçmişinden doldurur.
+Tekrar çalıştırılabilir: backfill satırları geçmişten yeniden hesaplar.
+Kullanım: python -m scripts.migration_user_stats
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+
+
+SQL_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id UUID PRIMARY KEY REFERENCES users(id),
+    xp INTEGER NOT NULL DEFAULT 0,
+    quiz_count INTEGER NOT NULL DEFAULT 0,
+    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    total_questions INTEGER NOT NULL DEFAULT 0,
+    current_goal_id INTEGER REFERENCES learning_goals(id),
+    level VARCHAR(4),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+)
+"""
+
+# /api/statistics son 10 quiz'i bu indeksle okur
+SQL_RECENT_INDEX = """
+CREATE INDEX IF NOT EXISTS ix_quiz_sessions_user_created
+ON quiz_sessions (user_id, created_at DESC)
+"""
+
+SQL_BACKFILL = """
+INSERT INTO user_stats (user_id, xp, quiz_count, score_sum, total_questions, current_goal_id, level, updated_at)
+SELECT u.id,
+       COALESCE(q.xp, 0), COALESCE(q.quiz_count, 0), COALESCE(q.score_sum, 0), COALESCE(q.total_questions, 0),
+       g.id, g.level, NOW()
+FROM users u
+LEFT JOIN (
+    SELECT user_id,
+           SUM(correct_answers) AS xp,
+           COUNT(*) AS quiz_count,
+           SUM(score) AS score_sum,
+           SUM(total_questions) AS total_questions
+    FROM quiz_sessions
+    GROUP BY user_id
+) q ON q.user_id = u.id
+LEFT JOIN LATERAL (
+    SELECT id, level FROM learning_goals
+    WHERE user_id = u.id
+    ORDER BY created_at DESC
+    LIMIT 1
+) g ON TRUE
+WHERE q.user_id IS NOT NULL OR g.id IS NOT NULL
+ON CONFLICT (user_id) DO UPDATE SET
+    xp = EXCLUDED.xp,
+    quiz_count = EXCLUDED.quiz_count,
+    score_sum = EXCLUDED.score_sum,
+    total_questions = EXCLUDED.total_questions,
+    current_goal_id = EXCLUDED.current_goal_id,
+    level = EXCLUDED.level,
+    updated_at = NOW()
+"""
+
+
+async def migrate_user_stats():
+    """user_stats tablosunu oluşturur ve backfill yapar."""
+    engine = create_async_engine(settings.database_url, echo=True)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(SQL_CREATE_TABLE))
+        await conn.execute(text(SQL_RECENT_INDEX))
+        print("✅ user_stats tablosu ve quiz_sessions (user_id, created_at) indeksi hazır")
+
+        result = await conn.execute(text(SQL_BACKFILL))
+        print(f"✅ {result.rowcount} kullanıcı için istatistikler geçmişten hesaplandı")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_user_stats())
@@ -0,0 +1,52 @@
+"""
+vocabulary_words'e primary_example_sentence_id kolonunu ekler, örnek cümleleri
+word_sentences'tan doldurur ve keyset sayfalama için kapsayan indeksleri oluşturur.
+Kullanım: python -m scripts.migration_vocabulary_examples
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db import queries
+
+
+SQL_ADD_COLUMN = """
+ALTER TABLE vocabulary_words
+ADD COLUMN IF NOT EXISTS primary_example_sentence_id INTEGER REFERENCES sentences(id) ON DELETE SET NULL
+"""
+
+# /api/vocabulary/browse: filtreye göre index-only scan
+SQL_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_vocabulary_words_level_id ON vocabulary_words (level, id) INCLUDE (word, translation, category)",
+    "CREATE INDEX IF NOT EXISTS ix_vocabulary_words_category_id ON vocabulary_words (category, id) INCLUDE (word, translation, level)",
+]
+
+
+async def migrate_vocabulary_examples():
+    """Kolonu ekler, backfill yapar ve indeksleri oluşturur."""
+    engine = create_async_engine(settings.database_url, echo=True)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(SQL_ADD_COLUMN))
+        print("✅ primary_example_sentence_id kolonu hazır")
+
+        result = await conn.execute(queries.REFRESH_PRIMARY_EXAMPLES)
+        print(f"✅ {result.rowcount} kelimenin örnek cümlesi güncellendi")
+
+        for statement in SQL_INDEXES:
+            await conn.execute(text(statement))
+        print("✅ Keyset sayfalama indeksleri hazır")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_vocabulary_examples())
@@ -0,0 +1,46 @@
+"""
+Kelime araması için pg_trgm eklentisini ve GIN trigram indekslerini ekler.
+İndeks ifadeleri, bellek içi indeks hazır değilken kullanılan SQL yedeğindeki
+(app.services.vocabulary_search) Türkçe İ/ı katlamasıyla birebir aynıdır.
+Kullanım: python -m scripts.migration_vocabulary_search
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.services.vocabulary_search import SQL_FOLD_TRANSLATION, SQL_FOLD_WORD
+
+
+SQL_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+SQL_INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS ix_vocabulary_words_word_trgm ON vocabulary_words USING gin (({SQL_FOLD_WORD}) gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS ix_vocabulary_words_translation_trgm ON vocabulary_words USING gin (({SQL_FOLD_TRANSLATION}) gin_trgm_ops)",
+]
+
+
+async def add_vocabulary_search_indexes():
+    """pg_trgm eklentisini ve word/translation trigram indekslerini oluşturur."""
+    engine = create_async_engine(settings.database_url, echo=True)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(SQL_EXTENSION))
+        print("✅ pg_trgm eklentisi hazır")
+
+        for statement in SQL_INDEXES:
+            await conn.execute(text(statement))
+        print("✅ Kelime arama indeksleri hazır")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(add_vocabulary_search_indexes())
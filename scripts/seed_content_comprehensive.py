@@ -15,9 +15,11 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import select
 
 from app.core.config import settings
+from app.db import queries
 from app.models.quiz import QuizQuestion
 from app.models.vocabulary import VocabularyWord
 from app.models.learning_goal import Base
+from app.models.content_meta import ContentMeta  # noqa: F401  (create_all + sürüm artırma)
 
 
 # TÜM SEVİYELER İÇİN KELİMELER
@@ -887,6 +889,7 @@ async def seed_content():
             else:
                 print("ℹ️  Tüm quiz soruları zaten mevcut")
             
+            await session.execute(queries.BUMP_CONTENT_VERSION)  # API yanıt cache'lerini geçersiz kılar
             await session.commit()
     
     print(f"\n✅ İçerik seed işlemi tamamlandı!")